@@ -0,0 +1 @@
+"""Benchmarks for the Anthropic Conversation integration."""
@@ -0,0 +1,108 @@
+"""Local stand-in for the Anthropic Messages API used by the benchmarks."""
+from __future__ import annotations
+
+import asyncio
+import random
+from typing import Any
+
+from aiohttp import web
+from homeassistant.util import ulid
+
+DEFAULT_REPLY = [{"type": "text", "text": "OK."}]
+
+
+def _last_utterance(messages: list[dict]) -> tuple[str | None, int]:
+    """Return the last plain user utterance and the tool rounds after it."""
+    rounds = 0
+    for message in reversed(messages):
+        if message["role"] == "user" and isinstance(message["content"], str):
+            return message["content"], rounds
+        if message["role"] == "assistant":
+            rounds += 1
+    return None, rounds
+
+
+class FakeAnthropicServer:
+    """Serve recorded Messages API responses with configurable latency.
+
+    Responses are looked up by the utterance that started the turn and the
+    number of tool rounds already taken, so replay is stateless and safe to
+    run with overlapping conversations.
+    """
+
+    def __init__(
+        self,
+        recordings: dict[str, list[dict]],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the server."""
+        self.recordings = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+        self.url: str | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start the server and return its base URL."""
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/messages", self._handle_messages)
+        app.router.add_get("/v1/models", self._handle_models)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> None:
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _handle_models(self, request: web.Request) -> web.Response:
+        return web.json_response({"data": [], "has_more": False})
+
+    async def _handle_messages(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = await request.json()
+        utterance, rounds = _last_utterance(body["messages"])
+        responses = self.recordings.get(utterance) or [{"content": DEFAULT_REPLY}]
+        recorded = responses[min(rounds, len(responses) - 1)]
+        await self._delay()
+        return web.json_response(self._message(body, recorded))
+
+    def _message(self, body: dict[str, Any], recorded: dict[str, Any]) -> dict:
+        content = recorded.get("content", DEFAULT_REPLY)
+        stop_reason = recorded.get(
+            "stop_reason",
+            "tool_use"
+            if any(block["type"] == "tool_use" for block in content)
+            else "end_turn",
+        )
+        return {
+            "id": f"msg_{ulid.ulid()}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "claude-fake"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": recorded.get(
+                "usage",
+                {
+                    "input_tokens": len(str(body.get("system", ""))) // 4,
+                    "output_tokens": 16,
+                },
+            ),
+        }
@@ -0,0 +1,144 @@
+"""Profile the integration's contribution to Home Assistant start up time.
+
+Run from the repository root. ``--tree`` profiles the integration of
+another checkout, e.g. an earlier commit in a worktree:
+
+    git worktree add /tmp/before <commit>
+    python -m benchmarks.import_time --runs 10 --tree /tmp/before
+    python -m benchmarks.import_time --runs 10 --json after.json
+
+Each run imports the Home Assistant modules the integration builds on in a
+fresh interpreter with ``-X importtime``, then the same plus the modules
+Home Assistant loads for a config entry (package, config flow, sensor
+platform). The difference of the medians is the integration's share of
+start up, and the modules only the second set pulled in are listed by
+their own import time. ``--first-use`` adds the modules deferred until
+the first request (the SDK and the image helpers) to show their cost.
+"""
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+PACKAGE = "custom_components.anthropic_conversation"
+
+BASELINE_MODULES = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.components.conversation",
+    "homeassistant.components.sensor",
+    "homeassistant.helpers.template",
+    "homeassistant.helpers.selector",
+)
+INTEGRATION_MODULES = (
+    PACKAGE,
+    f"{PACKAGE}.config_flow",
+    f"{PACKAGE}.sensor",
+)
+FIRST_USE_MODULES = (
+    "anthropic",
+    f"{PACKAGE}.images",
+)
+
+
+def import_times(modules: tuple[str, ...], tree: Path) -> dict[str, int]:
+    """Import modules in a fresh interpreter and return self time per module in us."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=tree,
+    )
+    if result.returncode:
+        # The last lines of stderr hold the traceback, not import times
+        raise SystemExit(
+            f"Importing {', '.join(modules)} from {tree} failed:\n"
+            + "\n".join(
+                line
+                for line in result.stderr.splitlines()
+                if not line.startswith("import time:")
+            )
+        )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def profile(
+    modules: tuple[str, ...], runs: int, tree: Path
+) -> tuple[float, dict[str, float]]:
+    """Return the median total import time in ms and median self time per module."""
+    totals = []
+    per_module: dict[str, list[int]] = defaultdict(list)
+    for _ in range(runs):
+        times = import_times(modules, tree)
+        totals.append(sum(times.values()))
+        for name, self_us in times.items():
+            per_module[name].append(self_us)
+    return statistics.median(totals) / 1000, {
+        name: statistics.median(samples) / 1000 for name, samples in per_module.items()
+    }
+
+
+def main() -> None:
+    """Parse arguments and print the profile."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--first-use", action="store_true")
+    parser.add_argument(
+        "--tree",
+        type=Path,
+        default=Path(__file__).parent.parent,
+        help="Repository root whose integration is profiled",
+    )
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    modules = BASELINE_MODULES + INTEGRATION_MODULES
+    if args.first_use:
+        modules += FIRST_USE_MODULES
+
+    baseline_total, baseline_modules = profile(BASELINE_MODULES, args.runs, args.tree)
+    total, integration_modules = profile(modules, args.runs, args.tree)
+    added = sorted(
+        (
+            (name, self_ms)
+            for name, self_ms in integration_modules.items()
+            if name not in baseline_modules
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+
+    print(f"baseline            {baseline_total:8.1f}ms")
+    print(f"with integration    {total:8.1f}ms")
+    print(f"integration share   {total - baseline_total:8.1f}ms")
+    print(f"modules added       {len(added):8d}")
+    for name, self_ms in added[: args.top]:
+        print(f"  {self_ms:8.2f}ms  {name}")
+
+    if args.json:
+        results: dict[str, Any] = {
+            "baseline_ms": baseline_total,
+            "total_ms": total,
+            "integration_ms": total - baseline_total,
+            "added_modules": dict(added),
+        }
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
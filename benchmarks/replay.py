@@ -0,0 +1,418 @@
+"""Replay recorded conversations against AnthropicAgent.
+
+Run from the repository root:
+
+    python -m benchmarks.replay --turns 2000 --entities 50,500,2000,10000
+
+Each run boots a bare Home Assistant core in a temporary config directory,
+populates and exposes the recorded entities plus synthetic ones up to the
+requested count, and replays the recording against a local fake Messages
+API server. Per-stage timings, latency percentiles, event loop block time
+and memory growth are reported for each entity count.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+import functools
+import json
+import os
+from pathlib import Path
+import statistics
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any
+
+from homeassistant.components import conversation
+from homeassistant.components.homeassistant.exposed_entities import (
+    DATA_EXPOSED_ENTITIES,
+    ExposedEntities,
+    async_expose_entity,
+)
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import Context, HomeAssistant, ServiceCall
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+    floor_registry as fr,
+    label_registry as lr,
+)
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.helpers import async_create_client
+
+from .fake_server import FakeAnthropicServer
+
+DEFAULT_RECORDING = Path(__file__).parent / "recordings" / "sample.json"
+
+SYNTHETIC_DOMAINS = ("light", "switch", "cover", "sensor", "binary_sensor", "fan")
+SERVICE_STATES = {
+    "turn_on": "on",
+    "turn_off": "off",
+    "open_cover": "open",
+    "close_cover": "closed",
+    "lock": "locked",
+    "unlock": "unlocked",
+}
+SERVICE_DOMAINS = ("light", "switch", "cover", "fan", "lock")
+AREAS_PER_FLOOR = 8
+
+
+class StageTimer:
+    """Collect wall clock durations per stage."""
+
+    def __init__(self) -> None:
+        """Initialize the timer."""
+        self.samples: dict[str, list[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, func):
+        """Wrap a sync or async callable so its duration is recorded."""
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.samples[stage].append(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - start)
+
+        return wrapper
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked between ticks."""
+
+    def __init__(self, interval: float = 0.005, threshold: float = 0.002) -> None:
+        """Initialize the monitor."""
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_block = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            if lag > self.threshold:
+                self.blocked += lag
+                self.max_block = max(self.max_block, lag)
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Return p50/p95/p99 of samples in milliseconds."""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    if len(samples) == 1:
+        value = samples[0] * 1000
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+def load_recording(path: Path) -> dict[str, Any]:
+    """Load a recording and index its responses by utterance."""
+    recording = json.loads(path.read_text())
+    recording["responses"] = {
+        turn["utterance"]: turn["responses"]
+        for conv in recording["conversations"]
+        for turn in conv["turns"]
+    }
+    return recording
+
+
+async def async_setup_hass(
+    config_dir: str, recording: dict[str, Any], entity_count: int, area_count: int
+) -> HomeAssistant:
+    """Boot a bare Home Assistant core with exposed entities and services."""
+    hass = HomeAssistant(config_dir)
+    for registry in (fr, lr, ar, dr, er):
+        await registry.async_load(hass)
+    exposed = ExposedEntities(hass)
+    await exposed.async_initialize()
+    hass.data[DATA_EXPOSED_ENTITIES] = exposed
+
+    entities = list(recording["entities"])
+    for index in range(max(entity_count - len(entities), 0)):
+        domain = SYNTHETIC_DOMAINS[index % len(SYNTHETIC_DOMAINS)]
+        entities.append(
+            {
+                "entity_id": f"{domain}.synthetic_{index}",
+                "name": f"Synthetic {domain} {index}",
+                "state": "off",
+            }
+        )
+    area_ids = []
+    for index in range(area_count):
+        floor_index = index // AREAS_PER_FLOOR
+        if index % AREAS_PER_FLOOR == 0:
+            floor = fr.async_get(hass).async_create(f"Floor {floor_index}")
+        area = ar.async_get(hass).async_create(
+            f"Area {index}", floor_id=floor.floor_id
+        )
+        area_ids.append(area.id)
+
+    entity_registry = er.async_get(hass)
+    for index, entity in enumerate(entities):
+        if area_ids:
+            domain, object_id = entity["entity_id"].split(".", 1)
+            entity_registry.async_get_or_create(
+                domain, "benchmark", object_id, suggested_object_id=object_id
+            )
+            entity_registry.async_update_entity(
+                entity["entity_id"], area_id=area_ids[index % len(area_ids)]
+            )
+        hass.states.async_set(
+            entity["entity_id"],
+            entity["state"],
+            {"friendly_name": entity["name"]},
+        )
+        async_expose_entity(hass, conversation.DOMAIN, entity["entity_id"], True)
+
+    async def handle_service(call: ServiceCall) -> None:
+        state = SERVICE_STATES.get(call.service)
+        entity_ids = call.data.get("entity_id", [])
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        for entity_id in entity_ids:
+            current = hass.states.get(entity_id)
+            if current is not None and state is not None:
+                hass.states.async_set(entity_id, state, current.attributes)
+
+    for domain in SERVICE_DOMAINS:
+        for service in SERVICE_STATES:
+            hass.services.async_register(domain, service, handle_service)
+
+    await hass.async_start()
+    return hass
+
+
+async def async_run(
+    recording: dict[str, Any],
+    entity_count: int,
+    area_count: int,
+    turns: int,
+    concurrency: int,
+    server: FakeAnthropicServer,
+) -> dict[str, Any]:
+    """Replay the recording for one entity count and return the results."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_setup_hass(
+            config_dir, recording, entity_count, area_count
+        )
+        entry = SimpleNamespace(
+            entry_id="benchmark",
+            data={CONF_API_KEY: "benchmark"},
+            options={},
+        )
+        client = await async_create_client(hass, entry.data[CONF_API_KEY])
+        agent = AnthropicAgent(hass, entry, client)
+
+        timer = StageTimer()
+        agent.get_exposed_entities = timer.wrap(
+            "entities", agent.get_exposed_entities
+        )
+        agent._generate_system_message = timer.wrap(
+            "prompt", agent._generate_system_message
+        )
+        agent.execute_tool = timer.wrap("tools", agent.execute_tool)
+        agent.client.messages.create = timer.wrap(
+            "api", agent.client.messages.create
+        )
+        process = timer.wrap("total", agent.async_process)
+
+        conversations = recording["conversations"]
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+        scheduled = 0
+        while scheduled < turns:
+            for conv in conversations:
+                if scheduled >= turns:
+                    break
+                queue.put_nowait(conv)
+                scheduled += len(conv["turns"])
+
+        async def worker(index: int) -> None:
+            while not queue.empty():
+                conv = queue.get_nowait()
+                # Workers replay the same recordings, a shared device id would
+                # make their turns supersede each other.
+                device_id = conv.get("device_id")
+                if device_id is not None:
+                    device_id = f"{device_id}_{index}"
+                conversation_id = None
+                for turn in conv["turns"]:
+                    for entity_id, state in turn.get("entities", {}).items():
+                        current = hass.states.get(entity_id)
+                        if current is not None:
+                            hass.states.async_set(entity_id, state, current.attributes)
+                    result = await process(
+                        conversation.ConversationInput(
+                            text=turn["utterance"],
+                            context=Context(),
+                            conversation_id=conversation_id,
+                            device_id=device_id,
+                            language="en",
+                        )
+                    )
+                    conversation_id = result.conversation_id
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        monitor = LoopMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        await hass.async_stop(force=True)
+
+    completed = len(timer.samples["total"])
+    return {
+        "entities": entity_count,
+        "turns": completed,
+        "elapsed_s": elapsed,
+        "turns_per_s": completed / elapsed if elapsed else 0.0,
+        "latency_ms": percentiles(timer.samples["total"]),
+        "stages_ms": {
+            stage: percentiles(samples)
+            for stage, samples in timer.samples.items()
+            if stage != "total"
+        },
+        "loop_blocked_ms": monitor.blocked * 1000,
+        "loop_max_block_ms": monitor.max_block * 1000,
+        "memory_growth_kib": (memory_after - memory_before) / 1024,
+        "memory_peak_kib": memory_peak / 1024,
+        "conversations_retained": len(agent.history),
+        "max_queue_depth": agent.scheduler.max_waiting,
+        "superseded": agent.scheduler.superseded_count,
+        "routing": agent.router.stats(),
+    }
+
+
+def format_result(result: dict[str, Any]) -> str:
+    """Format one run as a human readable block."""
+    latency = result["latency_ms"]
+    lines = [
+        f"entities={result['entities']} turns={result['turns']} "
+        f"({result['turns_per_s']:.1f} turns/s)",
+        f"  latency  p50={latency['p50']:.2f}ms p95={latency['p95']:.2f}ms "
+        f"p99={latency['p99']:.2f}ms",
+    ]
+    for stage, stage_latency in sorted(result["stages_ms"].items()):
+        lines.append(
+            f"  {stage:<8} p50={stage_latency['p50']:.2f}ms "
+            f"p95={stage_latency['p95']:.2f}ms p99={stage_latency['p99']:.2f}ms"
+        )
+    lines.append(
+        f"  loop blocked={result['loop_blocked_ms']:.1f}ms "
+        f"max={result['loop_max_block_ms']:.1f}ms"
+    )
+    lines.append(
+        f"  memory growth={result['memory_growth_kib']:.1f}KiB "
+        f"peak={result['memory_peak_kib']:.1f}KiB "
+        f"conversations={result['conversations_retained']}"
+    )
+    lines.append(
+        f"  max queue depth={result['max_queue_depth']} "
+        f"superseded={result['superseded']}"
+    )
+    for model, stats in result["routing"]["models"].items():
+        lines.append(
+            f"  model {model}: requests={stats['requests']} "
+            f"input_tokens={stats['input_tokens']} "
+            f"output_tokens={stats['output_tokens']}"
+        )
+    return "\n".join(lines)
+
+
+async def async_main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Run the benchmark for every requested entity count."""
+    recording = load_recording(Path(args.recording))
+    server = FakeAnthropicServer(
+        recording["responses"],
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        seed=args.seed,
+    )
+    os.environ["ANTHROPIC_BASE_URL"] = await server.start()
+    results = []
+    try:
+        for entity_count in args.entities:
+            result = await async_run(
+                recording,
+                entity_count,
+                args.areas,
+                args.turns,
+                args.concurrency,
+                server,
+            )
+            print(format_result(result), flush=True)
+            results.append(result)
+    finally:
+        await server.stop()
+    return results
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", default=str(DEFAULT_RECORDING))
+    parser.add_argument(
+        "--entities",
+        type=lambda value: [int(count) for count in value.split(",")],
+        default=[50, 500, 2000, 10000],
+        help="Comma separated entity counts to benchmark",
+    )
+    parser.add_argument(
+        "--areas",
+        type=int,
+        default=20,
+        help="Number of areas the entities are spread over (0 for none)",
+    )
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_main(args))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 """The Anthropic Conversation integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
 import json
 import logging
-from typing import Literal
-
-from anthropic import AsyncAnthropic, APIStatusError, APIConnectionError, APITimeoutError
-import yaml
+import time
+from typing import TYPE_CHECKING, Literal
 
 from homeassistant.components import conversation
 from homeassistant.components.homeassistant.exposed_entities import async_should_expose
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ATTR_NAME, CONF_API_KEY, MATCH_ALL
+from homeassistant.const import ATTR_NAME, CONF_API_KEY, MATCH_ALL, Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import (
     ConfigEntryNotReady,
@@ -20,7 +22,6 @@ from homeassistant.exceptions import (
 )
 from homeassistant.helpers import (
     config_validation as cv,
-    entity_registry as er,
     intent,
     template,
 )
@@ -28,29 +29,73 @@ from homeassistant.helpers.typing import ConfigType
 from homeassistant.util import ulid
 
 from .const import (
-    CONF_MODEL,
     CONF_MAX_TOKENS,
     CONF_TEMPERATURE,
     CONF_TOP_P,
     CONF_PROMPT,
     CONF_TOOLS,
-    DEFAULT_MODEL,
+    CONF_MAX_TOOL_CALLS_PER_CONVERSATION,
+    CONF_CONTEXT_THRESHOLD,
+    CONF_CONTEXT_TRUNCATE_STRATEGY,
+    CONF_DAILY_COST_CAP,
+    CONF_ENTITY_CONTEXT,
+    CONF_EVENT_PAYLOAD,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_PROMPT_CACHE,
+    CONF_SUPPRESS_NOOP_CALLS,
+    DATA_AGENT,
+    DEGRADED_CONTEXT_RATIO,
     DEFAULT_MAX_TOKENS,
     DEFAULT_TEMPERATURE,
     DEFAULT_TOP_P,
     DEFAULT_PROMPT,
     DEFAULT_CONF_TOOLS,
+    DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION,
+    DEFAULT_CONTEXT_THRESHOLD,
+    DEFAULT_CONTEXT_TRUNCATE_STRATEGY,
+    DEFAULT_DAILY_COST_CAP,
+    DEFAULT_ENTITY_CONTEXT,
+    DEFAULT_EVENT_PAYLOAD,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_PROMPT_CACHE,
+    DEFAULT_SUPPRESS_NOOP_CALLS,
     DOMAIN,
     EVENT_CONVERSATION_FINISHED,
+    PREPARE_TTL,
+    PROMPT_CACHE_BETA,
+    TOOL_LIMIT_REPLY,
+)
+from .concurrency import (
+    PRIORITY_AUTOMATION,
+    PRIORITY_INTERACTIVE,
+    ConversationScheduler,
+)
+from .entity_context import EntityContextCache, summarize_areas
+from .exceptions import AnthropicError, CannotConnect, InvalidAuth
+from .helpers import (
+    FUNCTION_EXECUTORS,
+    build_conversation_event_data,
+    convert_tools,
+    exposed_entity_ids,
+    load_tools,
+    split_system_message,
+    sum_usage,
+    tool_failed,
+    validate_authentication,
 )
-from .helpers import validate_authentication
+from .router import ModelRouter
+from .tokens import TokenEstimator, billed_input_tokens, truncate_messages
+from .usage import UsageTracker
 from .services import async_setup_services
 
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
 _LOGGER = logging.getLogger(__name__)
 
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-DATA_AGENT = "agent"
+PLATFORMS = [Platform.SENSOR]
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up Anthropic Conversation."""
@@ -60,40 +105,77 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Anthropic Conversation from a config entry."""
     try:
-        await validate_authentication(
+        client = await validate_authentication(
             hass=hass,
             api_key=entry.data[CONF_API_KEY],
         )
-    except APIStatusError as err:
+    except InvalidAuth as err:
         _LOGGER.error("Invalid API key: %s", err)
         return False
-    except (APIConnectionError, APITimeoutError) as err:
+    except CannotConnect as err:
         raise ConfigEntryNotReady(err) from err
 
-    agent = AnthropicAgent(hass, entry)
+    agent = AnthropicAgent(hass, entry, client)
+    await agent.usage.async_load()
+    entry.async_on_unload(agent.usage.async_setup())
+    entry.async_on_unload(agent.entity_context.async_setup())
 
     data = hass.data.setdefault(DOMAIN, {}).setdefault(entry.entry_id, {})
     data[CONF_API_KEY] = entry.data[CONF_API_KEY]
     data[DATA_AGENT] = agent
 
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     conversation.async_set_agent(hass, entry, agent)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     return True
 
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without a reload, which would drop all state.
+
+    Every other option is read per request, only the request cap is held.
+    """
+    agent = hass.data[DOMAIN][entry.entry_id][DATA_AGENT]
+    agent.scheduler.resize(
+        entry.options.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+    )
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Anthropic."""
-    hass.data[DOMAIN].pop(entry.entry_id)
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    agent = hass.data[DOMAIN].pop(entry.entry_id)[DATA_AGENT]
     conversation.async_unset_agent(hass, entry)
+    # A reloaded entry loads the counters from disk, save the pending ones
+    await agent.usage.async_flush()
     return True
 
+@dataclass
+class PreparedTurn:
+    """State built ahead of a turn by AnthropicAgent.async_prepare."""
+
+    exposed_entities: list[dict]
+    system_message: dict | None
+    created: float
+
 class AnthropicAgent(conversation.AbstractConversationAgent):
     """Anthropic conversation agent."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(
+        self, hass: HomeAssistant, entry: ConfigEntry, client: AsyncAnthropic
+    ) -> None:
         """Initialize the agent."""
         self.hass = hass
         self.entry = entry
         self.history: dict[str, list[dict]] = {}
-        self.client = AsyncAnthropic(api_key=entry.data[CONF_API_KEY])
+        self.client = client
+        self.scheduler = ConversationScheduler(
+            entry.options.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS)
+        )
+        self._prepared: dict[str, PreparedTurn] = {}
+        self.router = ModelRouter()
+        self.entity_context = EntityContextCache(hass)
+        self.estimator = TokenEstimator()
+        self.usage = UsageTracker(hass, entry.entry_id)
 
     @property
     def supported_languages(self) -> list[str] | Literal["*"]:
@@ -103,17 +185,79 @@ class AnthropicAgent(conversation.AbstractConversationAgent):
     async def async_process(
         self, user_input: conversation.ConversationInput
     ) -> conversation.ConversationResult:
-        exposed_entities = self.get_exposed_entities()
+        priority = (
+            PRIORITY_INTERACTIVE
+            if user_input.device_id is not None
+            else PRIORITY_AUTOMATION
+        )
+        task = self.hass.async_create_task(
+            self._async_process_turn(user_input, priority)
+        )
+        if priority == PRIORITY_INTERACTIVE:
+            self.scheduler.supersede(user_input.device_id, task)
+        try:
+            result, fire_event = await task
+        except asyncio.CancelledError:
+            if not self.scheduler.was_superseded(task):
+                raise
+        else:
+            if fire_event is not None:
+                # Scheduled from here, not the turn task, so the pipeline
+                # gets the result before any listener runs.
+                self.hass.loop.call_soon(fire_event)
+            return result
+
+        intent_response = intent.IntentResponse(language=user_input.language)
+        intent_response.async_set_error(
+            intent.IntentResponseErrorCode.UNKNOWN,
+            "Cancelled by a newer request",
+        )
+        return conversation.ConversationResult(
+            response=intent_response, conversation_id=user_input.conversation_id
+        )
 
+    async def _async_process_turn(
+        self, user_input: conversation.ConversationInput, priority: int
+    ) -> tuple[conversation.ConversationResult, Callable[[], None] | None]:
+        """Process a turn, return the result and the callback firing its event."""
+        started = time.monotonic()
         if user_input.conversation_id in self.history:
             conversation_id = user_input.conversation_id
-            messages = self.history[conversation_id]
         else:
             conversation_id = ulid.ulid()
             user_input.conversation_id = conversation_id
+
+        async with self.scheduler.conversation(conversation_id):
+            return await self._async_process_locked(
+                user_input, conversation_id, priority, started
+            )
+
+    async def _async_process_locked(
+        self,
+        user_input: conversation.ConversationInput,
+        conversation_id: str,
+        priority: int,
+        started: float,
+    ) -> tuple[conversation.ConversationResult, Callable[[], None] | None]:
+        # Imported by async_create_client before any agent exists
+        import anthropic  # pylint: disable=import-outside-toplevel
+
+        locked = time.monotonic()
+        warm = self._take_prepared(user_input.device_id)
+        if warm is not None:
+            exposed_entities = warm.exposed_entities
+        else:
+            exposed_entities = self.get_exposed_entities()
+
+        if conversation_id in self.history:
+            # Work on a copy so a failed or cancelled turn leaves history intact.
+            messages = list(self.history[conversation_id])
+        elif warm is not None and warm.system_message is not None:
+            messages = [warm.system_message]
+        else:
             try:
                 system_message = self._generate_system_message(
-                    exposed_entities, user_input
+                    exposed_entities, user_input.device_id
                 )
             except TemplateError as err:
                 _LOGGER.error("Error rendering prompt: %s", err)
@@ -124,16 +268,29 @@ class AnthropicAgent(conversation.AbstractConversationAgent):
                 )
                 return conversation.ConversationResult(
                     response=intent_response, conversation_id=conversation_id
-                )
+                ), None
             messages = [system_message]
 
-        human_message = {"role": "human", "content": user_input.text}
+        human_message = {"role": "user", "content": user_input.text}
         messages.append(human_message)
 
+        degraded = self.usage.async_over_cap(
+            self.entry.options.get(CONF_DAILY_COST_CAP, DEFAULT_DAILY_COST_CAP)
+        )
+        messages = self._fit_context(messages, degraded)
+        turn_start = len(messages) - 1
+
         try:
-            query_response = await self.query(user_input, messages, exposed_entities)
-        except (APIStatusError, APIConnectionError, APITimeoutError) as err:
+            prepare_finished = time.monotonic()
+            async with self.scheduler.slot(priority):
+                query_started = time.monotonic()
+                query_response, usages = await self.query(
+                    user_input, messages, exposed_entities, degraded
+                )
+            query_finished = time.monotonic()
+        except anthropic.APIError as err:
             _LOGGER.error(err)
+            self.router.record_failure(conversation_id)
             intent_response = intent.IntentResponse(language=user_input.language)
             intent_response.async_set_error(
                 intent.IntentResponseErrorCode.UNKNOWN,
@@ -141,9 +298,10 @@ class AnthropicAgent(conversation.AbstractConversationAgent):
             )
             return conversation.ConversationResult(
                 response=intent_response, conversation_id=conversation_id
-            )
+            ), None
         except HomeAssistantError as err:
             _LOGGER.error(err, exc_info=err)
+            self.router.record_failure(conversation_id)
             intent_response = intent.IntentResponse(language=user_input.language)
             intent_response.async_set_error(
                 intent.IntentResponseErrorCode.UNKNOWN,
@@ -151,45 +309,192 @@ class AnthropicAgent(conversation.AbstractConversationAgent):
             )
             return conversation.ConversationResult(
                 response=intent_response, conversation_id=conversation_id
-            )
-
-        messages.append({"role": "assistant", "content": query_response.content})
+            ), None
+
+        # Tool calls left over at the limit have no result and would make
+        # every later request of the conversation invalid, drop them.
+        content = [
+            block.model_dump()
+            for block in query_response.content
+            if block.type != "tool_use"
+        ]
+        if not any(block["type"] == "text" and block["text"] for block in content):
+            content.append({"type": "text", "text": TOOL_LIMIT_REPLY})
+        messages.append({"role": "assistant", "content": content})
         self.history[conversation_id] = messages
+        if query_response.stop_reason != "max_tokens":
+            self.router.record_success(conversation_id)
+
+        timings = {
+            "queued": (locked - started) + (query_started - prepare_finished),
+            "prepare": prepare_finished - locked,
+            "query": query_finished - query_started,
+            "total": time.monotonic() - started,
+        }
+        intent_response = intent.IntentResponse(language=user_input.language)
+        intent_response.async_set_speech(
+            "".join(block["text"] for block in content if block["type"] == "text")
+        )
+        # Building and firing the event is deferred until the result has been
+        # handed back to the pipeline so listeners never delay the reply.
+        return conversation.ConversationResult(
+            response=intent_response, conversation_id=conversation_id
+        ), partial(
+            self._async_fire_conversation_finished,
+            conversation_id,
+            user_input,
+            query_response,
+            sum_usage(usages),
+            messages,
+            turn_start,
+            timings,
+        )
 
+    def _async_fire_conversation_finished(
+        self,
+        conversation_id: str,
+        user_input: conversation.ConversationInput,
+        response,
+        usage: dict[str, int] | None,
+        messages: list[dict],
+        turn_start: int,
+        timings: dict[str, float],
+    ) -> None:
+        """Fire the conversation finished event."""
+        mode = self.entry.options.get(CONF_EVENT_PAYLOAD, DEFAULT_EVENT_PAYLOAD)
         self.hass.bus.async_fire(
             EVENT_CONVERSATION_FINISHED,
-            {
-                "response": query_response.model_dump(),
-                "user_input": user_input,
-                "messages": messages,
-            },
+            build_conversation_event_data(
+                mode,
+                self.entry.entry_id,
+                conversation_id,
+                user_input,
+                response,
+                usage,
+                messages,
+                turn_start,
+                timings,
+                self.scheduler.stats(),
+            ),
         )
 
-        intent_response = intent.IntentResponse(language=user_input.language)
-        intent_response.async_set_speech(query_response.content)
-        return conversation.ConversationResult(
-            response=intent_response, conversation_id=conversation_id
+    async def async_prepare(
+        self, device_id: str | None = None, conversation_id: str | None = None
+    ) -> None:
+        """Prepare for an upcoming turn from device_id.
+
+        Called when a wake word fires or a pipeline starts, so the turn that
+        follows starts from a rendered prompt and a warm connection. A turn
+        continuing conversation_id sends its stored prompt, so only a new
+        conversation gets a prompt rendered and written to the cache.
+        """
+        if device_id is None:
+            # Prepared state without a device would be taken by any next turn
+            await self._async_warm_up(None)
+            return
+        exposed_entities = self.get_exposed_entities()
+        system_message = None
+        if conversation_id not in self.history:
+            try:
+                system_message = self._generate_system_message(
+                    exposed_entities, device_id
+                )
+            except TemplateError as err:
+                _LOGGER.debug("Error rendering prompt while preparing: %s", err)
+                return
+        self._prepared[device_id] = PreparedTurn(
+            exposed_entities, system_message, time.monotonic()
+        )
+        await self._async_warm_up(
+            system_message["content"] if system_message is not None else None
         )
 
-    def _generate_system_message(
-        self, exposed_entities, user_input: conversation.ConversationInput
-    ):
+    def _take_prepared(self, device_id: str | None) -> PreparedTurn | None:
+        """Return and consume the prepared state for device_id if still fresh."""
+        if device_id is None:
+            return None
+        prepared = self._prepared.pop(device_id, None)
+        if prepared is None or time.monotonic() - prepared.created > PREPARE_TTL:
+            return None
+        return prepared
+
+    async def _async_warm_up(self, system: str | None) -> None:
+        """Open the HTTP connection and, if enabled, write system to the prompt cache."""
+        # Imported by async_create_client before any agent exists
+        import anthropic  # pylint: disable=import-outside-toplevel
+        import httpx  # pylint: disable=import-outside-toplevel
+
+        try:
+            if (
+                system is not None
+                and self.entry.options.get(CONF_PROMPT_CACHE, DEFAULT_PROMPT_CACHE)
+                and not self.usage.async_over_cap(
+                    self.entry.options.get(CONF_DAILY_COST_CAP, DEFAULT_DAILY_COST_CAP)
+                )
+            ):
+                model = self.router.default_model(self.entry.options)
+                # A billed model request, so it counts against the cap like a turn
+                async with self.scheduler.slot(PRIORITY_AUTOMATION):
+                    response = await self.client.messages.create(
+                        model=model,
+                        system=self._system_param(system),
+                        messages=[{"role": "user", "content": "."}],
+                        max_tokens=1,
+                        tools=self.get_tools(),
+                        extra_headers=self._extra_headers(),
+                    )
+                # Cache writes are billed above the input price
+                self.usage.async_record(model, response.usage)
+            else:
+                await self.client.get("/v1/models", cast_to=httpx.Response)
+        except anthropic.APIError as err:
+            _LOGGER.debug("Warm up request failed: %s", err)
+
+    def _system_param(self, system: str):
+        """Return the system parameter, marked for caching when enabled."""
+        if not self.entry.options.get(CONF_PROMPT_CACHE, DEFAULT_PROMPT_CACHE):
+            return system
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    def _extra_headers(self) -> dict[str, str] | None:
+        """Return extra request headers for the enabled beta features."""
+        if not self.entry.options.get(CONF_PROMPT_CACHE, DEFAULT_PROMPT_CACHE):
+            return None
+        return {"anthropic-beta": PROMPT_CACHE_BETA}
+
+    def _generate_system_message(self, exposed_entities, device_id: str | None):
         raw_prompt = self.entry.options.get(CONF_PROMPT, DEFAULT_PROMPT)
-        prompt = self._async_generate_prompt(raw_prompt, exposed_entities, user_input)
+        prompt = self._async_generate_prompt(raw_prompt, exposed_entities, device_id)
         return {"role": "system", "content": prompt}
 
     def _async_generate_prompt(
         self,
         raw_prompt: str,
         exposed_entities,
-        user_input: conversation.ConversationInput,
+        device_id: str | None,
     ) -> str:
         """Generate a prompt for the user."""
+        prompt_entities = exposed_entities
+        area_summaries = []
+        current_area_id = self.entity_context.device_area(device_id)
+        # A prompt that does not render area_summaries, e.g. one saved before
+        # they existed, would lose every other area, so it gets flat context.
+        if (
+            current_area_id is not None
+            and self.entry.options.get(CONF_ENTITY_CONTEXT, DEFAULT_ENTITY_CONTEXT)
+            == "hierarchical"
+            and "area_summaries" in raw_prompt
+        ):
+            prompt_entities, area_summaries = summarize_areas(
+                exposed_entities, current_area_id
+            )
         return template.Template(raw_prompt, self.hass).async_render(
             {
                 "ha_name": self.hass.config.location_name,
-                "exposed_entities": exposed_entities,
-                "current_device_id": user_input.device_id,
+                "exposed_entities": prompt_entities,
+                "area_summaries": area_summaries,
+                "current_device_id": device_id,
+                "current_area_id": current_area_id,
             },
             parse_result=False,
         )
@@ -200,91 +505,195 @@ class AnthropicAgent(conversation.AbstractConversationAgent):
             for state in self.hass.states.async_all()
             if async_should_expose(self.hass, conversation.DOMAIN, state.entity_id)
         ]
-        entity_registry = er.async_get(self.hass)
         exposed_entities = []
         for state in states:
-            entity_id = state.entity_id
-            entity = entity_registry.async_get(entity_id)
-
-            aliases = []
-            if entity and entity.aliases:
-                aliases = entity.aliases
-
             exposed_entities.append(
                 {
-                    "entity_id": entity_id,
+                    **self.entity_context.lookup(state.entity_id),
+                    "entity_id": state.entity_id,
                     "name": state.name,
-                    "state": self.hass.states.get(entity_id).state,
-                    "aliases": aliases,
+                    "state": state.state,
                 }
             )
         return exposed_entities
 
+    def _fit_context(self, messages: list[dict], degraded: bool) -> list[dict]:
+        """Truncate the history before sending if it would exceed the threshold."""
+        threshold = self.entry.options.get(
+            CONF_CONTEXT_THRESHOLD, DEFAULT_CONTEXT_THRESHOLD
+        )
+        strategy = self.entry.options.get(
+            CONF_CONTEXT_TRUNCATE_STRATEGY, DEFAULT_CONTEXT_TRUNCATE_STRATEGY
+        )
+        if degraded:
+            # Over the daily cost cap, keep sending but with less context.
+            threshold = int(threshold * DEGRADED_CONTEXT_RATIO)
+            strategy = "trim"
+        tools = self.get_tools()
+        estimated = self.estimator.estimate(messages, tools)
+        if estimated <= threshold:
+            return messages
+        truncated = truncate_messages(
+            messages, strategy, threshold, self.estimator, tools
+        )
+        _LOGGER.debug(
+            "Estimated %s tokens exceed the threshold of %s, %s kept %s of %s messages",
+            estimated,
+            threshold,
+            strategy,
+            len(truncated),
+            len(messages),
+        )
+        return truncated
+
     async def query(
         self,
         user_input: conversation.ConversationInput,
         messages,
         exposed_entities,
+        degraded: bool = False,
     ):
-        """Process a sentence."""
-        model = self.entry.options.get(CONF_MODEL, DEFAULT_MODEL)
-        max_tokens = self.entry.options.get(CONF_MAX_TOKENS, DEFAULT_MAX_TOKENS)
-        top_p = self.entry.options.get(CONF_TOP_P, DEFAULT_TOP_P)
-        temperature = self.entry.options.get(CONF_TEMPERATURE, DEFAULT_TEMPERATURE)
-        tools = self.entry.options.get(CONF_TOOLS, DEFAULT_CONF_TOOLS)
+        """Process a sentence.
+
+        Return the final response and the usage of every request made.
+        """
+        depth = sum(
+            1
+            for message in messages
+            if message["role"] == "user" and isinstance(message["content"], str)
+        )
+        model = self.router.select(
+            self.entry.options,
+            user_input.conversation_id,
+            user_input.text,
+            depth,
+            degraded,
+        )
+        tools = self.get_tools()
 
         _LOGGER.info("Prompt for %s: %s", model, messages)
 
-        response = await self.client.messages.create(
-            model=model,
-            messages=messages,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            temperature=temperature,
-            tools=tools,
-        )
+        response = await self._async_create(model, messages, tools)
+        usages = [response.usage]
 
         _LOGGER.info("Response %s", response.model_dump())
 
-        # Handle tool calls if present
-        if response.tool_calls:
-            for tool_call in response.tool_calls:
-                tool_response = await self.execute_tool(tool_call, exposed_entities, user_input)
-                messages.append({"role": "tool", "content": json.dumps(tool_response), "tool_call_id": tool_call.id})
-            
+        max_rounds = self.entry.options.get(
+            CONF_MAX_TOOL_CALLS_PER_CONVERSATION,
+            DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION,
+        )
+        exposed_ids = exposed_entity_ids(exposed_entities)
+        rounds = 0
+        # Answer tool calls until the model replies or the limit is reached
+        while response.stop_reason == "tool_use" and rounds < max_rounds:
+            rounds += 1
+            tool_uses = [
+                block for block in response.content if block.type == "tool_use"
+            ]
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": [block.model_dump() for block in response.content],
+                }
+            )
+            tool_results = []
+            failed = False
+            for tool_use in tool_uses:
+                tool_response = await self.execute_tool(
+                    tool_use, exposed_ids, user_input
+                )
+                failed = failed or tool_failed(tool_response)
+                tool_results.append(
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": tool_use.id,
+                        "content": json.dumps(tool_response),
+                        "is_error": tool_failed(tool_response),
+                    }
+                )
+            messages.append({"role": "user", "content": tool_results})
+
+            if failed and not degraded:
+                model = self.router.escalate(
+                    self.entry.options, user_input.conversation_id
+                )
+
             # Make another API call with the tool responses
-            response = await self.client.messages.create(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                top_p=top_p,
-                temperature=temperature,
-                tools=tools,
+            response = await self._async_create(model, messages, tools)
+            usages.append(response.usage)
+
+        if response.stop_reason == "tool_use":
+            _LOGGER.warning(
+                "Stopped after %s rounds of tool calls, dropping the remaining calls",
+                rounds,
             )
+        return response, usages
 
+    async def _async_create(self, model: str, messages, tools):
+        """Send the history to the Messages API and record model stats."""
+        system, api_messages = split_system_message(messages)
+        estimated = self.estimator.estimate(messages, tools)
+        started = time.monotonic()
+        response = await self.client.messages.create(
+            model=model,
+            system=self._system_param(system),
+            messages=api_messages,
+            max_tokens=self.entry.options.get(CONF_MAX_TOKENS, DEFAULT_MAX_TOKENS),
+            top_p=self.entry.options.get(CONF_TOP_P, DEFAULT_TOP_P),
+            temperature=self.entry.options.get(CONF_TEMPERATURE, DEFAULT_TEMPERATURE),
+            tools=tools,
+            extra_headers=self._extra_headers(),
+        )
+        usage = getattr(response, "usage", None)
+        self.router.record_response(model, time.monotonic() - started, usage)
+        if usage is not None:
+            self.estimator.calibrate(estimated, billed_input_tokens(usage))
+            self.usage.async_record(model, usage)
         return response
 
-    async def execute_tool(self, tool_call, exposed_entities, user_input):
+    def get_tools(self) -> list[dict]:
+        """Return the configured tools in Messages API format."""
+        tools = self.entry.options.get(CONF_TOOLS, DEFAULT_CONF_TOOLS)
+        if isinstance(tools, str):
+            return load_tools(tools)
+        return convert_tools(tools or [])
+
+    async def execute_tool(self, tool_use, exposed_ids, user_input):
         """Execute a tool call."""
-        if tool_call.function.name == "execute_services":
-            return await self.execute_services(json.loads(tool_call.function.arguments), exposed_entities, user_input)
+        if tool_use.name == "execute_services":
+            return await self.execute_services(tool_use.input, exposed_ids, user_input)
         else:
-            return {"error": f"Unknown tool: {tool_call.function.name}"}
+            return {"error": f"Unknown tool: {tool_use.name}"}
 
-    async def execute_services(self, arguments, exposed_entities, user_input):
+    async def execute_services(self, arguments, exposed_ids, user_input):
         """Execute Home Assistant services."""
+        executor = FUNCTION_EXECUTORS["native"]
+        suppress_noop = self.entry.options.get(
+            CONF_SUPPRESS_NOOP_CALLS, DEFAULT_SUPPRESS_NOOP_CALLS
+        )
         results = []
         for service_call in arguments.get("list", []):
             domain = service_call["domain"]
             service = service_call["service"]
-            service_data = service_call["service_data"]
-            
+
             try:
-                await self.hass.services.async_call(
-                    domain, service, service_data, context=user_input.context
+                result = await executor.execute_service_single(
+                    self.hass,
+                    None,
+                    service_call,
+                    user_input,
+                    exposed_ids,
+                    suppress_noop,
                 )
-                results.append({"success": True, "domain": domain, "service": service})
-            except Exception as err:
-                results.append({"success": False, "domain": domain, "service": service, "error": str(err)})
-        
+            except AnthropicError as err:
+                result = {"error": str(err)}
+            results.append(
+                {
+                    "success": "error" not in result,
+                    "domain": domain,
+                    "service": service,
+                    **result,
+                }
+            )
+
         return {"results": results}
@@ -0,0 +1,176 @@
+"""Concurrency control for the Anthropic Conversation agent."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_AUTOMATION = 1
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_AUTOMATION: "automation",
+}
+
+
+class PrioritySemaphore:
+    """Semaphore that wakes the lowest priority value first, FIFO within a priority."""
+
+    def __init__(self, value: int) -> None:
+        """Initialize the semaphore."""
+        self._value = value
+        self._capacity = value
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self.active = 0
+
+    def locked(self) -> bool:
+        """Return True if a new caller would have to wait."""
+        return self._value <= 0 or bool(self.waiting())
+
+    def waiting(self, priority: int | None = None) -> int:
+        """Return the number of pending waiters, optionally for one priority."""
+        return sum(
+            1
+            for waiter_priority, _, future in self._waiters
+            if not future.done()
+            and (priority is None or waiter_priority == priority)
+        )
+
+    async def acquire(self, priority: int) -> None:
+        """Acquire a slot, waiting behind higher priority callers."""
+        if not self.locked():
+            self._value -= 1
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Woken and cancelled at the same time, hand the slot on.
+                self.active += 1
+                self.release()
+            raise
+        self.active += 1
+
+    def release(self) -> None:
+        """Release a slot and wake the next waiter."""
+        self.active -= 1
+        # After shrinking, released slots first pay back the excess in use
+        while self._value >= 0 and self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    def resize(self, value: int) -> None:
+        """Change the number of slots, waking waiters if there are more."""
+        self._value += value - self._capacity
+        self._capacity = value
+        while self._value > 0 and self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._value -= 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class ConversationScheduler:
+    """Serialize turns per conversation and cap concurrent API requests.
+
+    Turns sharing a conversation id are queued behind each other so their
+    history is never interleaved. Requests to the API share a global cap
+    where interactive (satellite) turns are served before automations, and
+    a new interactive turn from a device cancels the one it supersedes.
+    """
+
+    def __init__(self, max_concurrent: int) -> None:
+        """Initialize the scheduler."""
+        self._semaphore = PrioritySemaphore(max_concurrent)
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._lock_users: dict[str, int] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._superseded: set[asyncio.Task] = set()
+        self.max_waiting = 0
+        self.superseded_count = 0
+
+    @asynccontextmanager
+    async def conversation(self, conversation_id: str) -> AsyncIterator[None]:
+        """Hold the conversation lock for the duration of the block."""
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        self._lock_users[conversation_id] = self._lock_users.get(conversation_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[conversation_id] -= 1
+            if not self._lock_users[conversation_id]:
+                del self._lock_users[conversation_id]
+                del self._locks[conversation_id]
+
+    @asynccontextmanager
+    async def slot(self, priority: int) -> AsyncIterator[None]:
+        """Hold one of the global API request slots."""
+        if self._semaphore.locked():
+            self.max_waiting = max(self.max_waiting, self._semaphore.waiting() + 1)
+        async with self._semaphore.slot(priority):
+            yield
+
+    def resize(self, max_concurrent: int) -> None:
+        """Change the cap on concurrent API requests in place."""
+        self._semaphore.resize(max_concurrent)
+
+    def supersede(self, key: str, task: asyncio.Task) -> None:
+        """Register task as the current turn for key, cancelling the previous one."""
+        previous = self._inflight.get(key)
+        if previous is not None and not previous.done():
+            _LOGGER.debug("Cancelling turn superseded by a new turn from %s", key)
+            self._superseded.add(previous)
+            self.superseded_count += 1
+            previous.cancel()
+        self._inflight[key] = task
+
+        def _done(done_task: asyncio.Task) -> None:
+            if self._inflight.get(key) is done_task:
+                del self._inflight[key]
+
+        task.add_done_callback(_done)
+
+    def was_superseded(self, task: asyncio.Task) -> bool:
+        """Return True if task was cancelled because a newer turn replaced it."""
+        if task in self._superseded:
+            self._superseded.discard(task)
+            return True
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue depth metrics."""
+        return {
+            "active": self._semaphore.active,
+            "waiting": {
+                name: self._semaphore.waiting(priority)
+                for priority, name in PRIORITY_NAMES.items()
+            },
+            "max_waiting": self.max_waiting,
+            "queued_turns": sum(
+                users - 1 for users in self._lock_users.values() if users > 1
+            ),
+            "superseded": self.superseded_count,
+        }
@@ -5,7 +5,6 @@ import logging
 from types import MappingProxyType
 from typing import Any
 
-from anthropic import APIStatusError, APIConnectionError
 import voluptuous as vol
 import yaml
 
@@ -25,9 +24,19 @@ from homeassistant.helpers.selector import (
 
 from .const import (
     CONF_MODEL,
+    CONF_MODEL_ROUTING,
+    CONF_FAST_MODEL,
+    CONF_ROUTING_MAX_WORDS,
+    CONF_ROUTING_MAX_DEPTH,
     CONF_CONTEXT_THRESHOLD,
     CONF_CONTEXT_TRUNCATE_STRATEGY,
+    CONF_DAILY_COST_CAP,
     CONF_TOOLS,
+    CONF_ENTITY_CONTEXT,
+    CONF_EVENT_PAYLOAD,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_PROMPT_CACHE,
+    CONF_SUPPRESS_NOOP_CALLS,
     CONF_MAX_TOOL_CALLS_PER_CONVERSATION,
     CONF_MAX_TOKENS,
     CONF_PROMPT,
@@ -36,15 +45,27 @@ from .const import (
     CONTEXT_TRUNCATE_STRATEGIES,
     DEFAULT_CONTEXT_THRESHOLD,
     DEFAULT_CONTEXT_TRUNCATE_STRATEGY,
+    DEFAULT_DAILY_COST_CAP,
+    DEFAULT_ENTITY_CONTEXT,
+    DEFAULT_EVENT_PAYLOAD,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_PROMPT_CACHE,
+    DEFAULT_SUPPRESS_NOOP_CALLS,
     DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION,
     DEFAULT_MAX_TOKENS,
     DEFAULT_MODEL,
+    DEFAULT_MODEL_ROUTING,
+    DEFAULT_FAST_MODEL,
+    DEFAULT_ROUTING_MAX_WORDS,
+    DEFAULT_ROUTING_MAX_DEPTH,
     DEFAULT_NAME,
     DEFAULT_PROMPT,
     DEFAULT_TEMPERATURE,
     DEFAULT_TOP_P,
     DEFAULT_CONF_TOOLS,
     DOMAIN,
+    ENTITY_CONTEXT_MODES,
+    EVENT_PAYLOAD_MODES,
 )
 from .exceptions import CannotConnect, InvalidAuth
 from .helpers import validate_authentication
@@ -58,10 +79,14 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
-DEFAULT_OPTIONS = types.MappingProxyType(
+DEFAULT_OPTIONS = MappingProxyType(
     {
         CONF_PROMPT: DEFAULT_PROMPT,
         CONF_MODEL: DEFAULT_MODEL,
+        CONF_MODEL_ROUTING: DEFAULT_MODEL_ROUTING,
+        CONF_FAST_MODEL: DEFAULT_FAST_MODEL,
+        CONF_ROUTING_MAX_WORDS: DEFAULT_ROUTING_MAX_WORDS,
+        CONF_ROUTING_MAX_DEPTH: DEFAULT_ROUTING_MAX_DEPTH,
         CONF_MAX_TOKENS: DEFAULT_MAX_TOKENS,
         CONF_MAX_TOOL_CALLS_PER_CONVERSATION: DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION,
         CONF_TOP_P: DEFAULT_TOP_P,
@@ -69,6 +94,12 @@ DEFAULT_OPTIONS = types.MappingProxyType(
         CONF_TOOLS: yaml.dump(DEFAULT_CONF_TOOLS),
         CONF_CONTEXT_THRESHOLD: DEFAULT_CONTEXT_THRESHOLD,
         CONF_CONTEXT_TRUNCATE_STRATEGY: DEFAULT_CONTEXT_TRUNCATE_STRATEGY,
+        CONF_DAILY_COST_CAP: DEFAULT_DAILY_COST_CAP,
+        CONF_EVENT_PAYLOAD: DEFAULT_EVENT_PAYLOAD,
+        CONF_MAX_CONCURRENT_REQUESTS: DEFAULT_MAX_CONCURRENT_REQUESTS,
+        CONF_PROMPT_CACHE: DEFAULT_PROMPT_CACHE,
+        CONF_SUPPRESS_NOOP_CALLS: DEFAULT_SUPPRESS_NOOP_CALLS,
+        CONF_ENTITY_CONTEXT: DEFAULT_ENTITY_CONTEXT,
     }
 )
 
@@ -94,7 +125,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         try:
-            await validate_authentication(self.hass, user_input)
+            await validate_authentication(self.hass, user_input[CONF_API_KEY])
         except CannotConnect:
             errors["base"] = "cannot_connect"
         except InvalidAuth:
@@ -148,11 +179,62 @@ class OptionsFlow(config_entries.OptionsFlow):
                 description={"suggested_value": options[CONF_PROMPT]},
                 default=DEFAULT_PROMPT,
             ): TemplateSelector(),
+            vol.Optional(
+                CONF_ENTITY_CONTEXT,
+                description={
+                    "suggested_value": options.get(
+                        CONF_ENTITY_CONTEXT, DEFAULT_ENTITY_CONTEXT
+                    )
+                },
+                default=DEFAULT_ENTITY_CONTEXT,
+            ): SelectSelector(
+                SelectSelectorConfig(
+                    options=[
+                        SelectOptionDict(value=mode["key"], label=mode["label"])
+                        for mode in ENTITY_CONTEXT_MODES
+                    ],
+                    mode=SelectSelectorMode.DROPDOWN,
+                )
+            ),
             vol.Optional(
                 CONF_MODEL,
                 description={"suggested_value": options[CONF_MODEL]},
                 default=DEFAULT_MODEL,
             ): str,
+            vol.Optional(
+                CONF_MODEL_ROUTING,
+                description={
+                    "suggested_value": options.get(
+                        CONF_MODEL_ROUTING, DEFAULT_MODEL_ROUTING
+                    )
+                },
+                default=DEFAULT_MODEL_ROUTING,
+            ): bool,
+            vol.Optional(
+                CONF_FAST_MODEL,
+                description={
+                    "suggested_value": options.get(CONF_FAST_MODEL, DEFAULT_FAST_MODEL)
+                },
+                default=DEFAULT_FAST_MODEL,
+            ): str,
+            vol.Optional(
+                CONF_ROUTING_MAX_WORDS,
+                description={
+                    "suggested_value": options.get(
+                        CONF_ROUTING_MAX_WORDS, DEFAULT_ROUTING_MAX_WORDS
+                    )
+                },
+                default=DEFAULT_ROUTING_MAX_WORDS,
+            ): int,
+            vol.Optional(
+                CONF_ROUTING_MAX_DEPTH,
+                description={
+                    "suggested_value": options.get(
+                        CONF_ROUTING_MAX_DEPTH, DEFAULT_ROUTING_MAX_DEPTH
+                    )
+                },
+                default=DEFAULT_ROUTING_MAX_DEPTH,
+            ): int,
             vol.Optional(
                 CONF_MAX_TOKENS,
                 description={"suggested_value": options[CONF_MAX_TOKENS]},
@@ -175,6 +257,33 @@ class OptionsFlow(config_entries.OptionsFlow):
                 },
                 default=DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION,
             ): int,
+            vol.Optional(
+                CONF_MAX_CONCURRENT_REQUESTS,
+                description={
+                    "suggested_value": options.get(
+                        CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+                    )
+                },
+                default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(
+                CONF_PROMPT_CACHE,
+                description={
+                    "suggested_value": options.get(
+                        CONF_PROMPT_CACHE, DEFAULT_PROMPT_CACHE
+                    )
+                },
+                default=DEFAULT_PROMPT_CACHE,
+            ): bool,
+            vol.Optional(
+                CONF_SUPPRESS_NOOP_CALLS,
+                description={
+                    "suggested_value": options.get(
+                        CONF_SUPPRESS_NOOP_CALLS, DEFAULT_SUPPRESS_NOOP_CALLS
+                    )
+                },
+                default=DEFAULT_SUPPRESS_NOOP_CALLS,
+            ): bool,
             vol.Optional(
                 CONF_TOOLS,
                 description={"suggested_value": options[CONF_TOOLS]},
@@ -200,4 +309,32 @@ class OptionsFlow(config_entries.OptionsFlow):
                     mode=SelectSelectorMode.DROPDOWN,
                 )
             ),
+            vol.Optional(
+                CONF_DAILY_COST_CAP,
+                description={
+                    "suggested_value": options.get(
+                        CONF_DAILY_COST_CAP, DEFAULT_DAILY_COST_CAP
+                    )
+                },
+                default=DEFAULT_DAILY_COST_CAP,
+            ): NumberSelector(
+                NumberSelectorConfig(min=0, step=0.01, unit_of_measurement="USD")
+            ),
+            vol.Optional(
+                CONF_EVENT_PAYLOAD,
+                description={
+                    "suggested_value": options.get(
+                        CONF_EVENT_PAYLOAD, DEFAULT_EVENT_PAYLOAD
+                    )
+                },
+                default=DEFAULT_EVENT_PAYLOAD,
+            ): SelectSelector(
+                SelectSelectorConfig(
+                    options=[
+                        SelectOptionDict(value=mode["key"], label=mode["label"])
+                        for mode in EVENT_PAYLOAD_MODES
+                    ],
+                    mode=SelectSelectorMode.DROPDOWN,
+                )
+            ),
         }
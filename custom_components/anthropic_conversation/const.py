@@ -5,6 +5,9 @@ DEFAULT_NAME = "Anthropic Conversation"
 
 EVENT_CONVERSATION_FINISHED = "anthropic_conversation.conversation.finished"
 
+DATA_AGENT = "agent"
+SIGNAL_USAGE_UPDATED = "anthropic_conversation_usage_updated_{}"
+
 CONF_PROMPT = "prompt"
 DEFAULT_PROMPT = """I want you to act as smart home manager of Home Assistant.
 I will provide information of smart home along with a question, you will truthfully make correction or answer using information provided in one sentence in everyday language.
@@ -13,11 +16,18 @@ Current Time: {{now()}}
 
 Available Devices:
 ```csv
-entity_id,name,state,aliases
+entity_id,name,state,area,aliases
 {% for entity in exposed_entities -%}
-{{ entity.entity_id }},{{ entity.name }},{{ entity.state }},{{entity.aliases | join('/')}}
+{{ entity.entity_id }},{{ entity.name }},{{ entity.state }},{{ entity.area or '' }},{{entity.aliases | join('/')}}
 {% endfor -%}
 ```
+{% if area_summaries %}
+Other areas (summarized with their entity ids, ask the user to be specific when a request is ambiguous):
+{% for area in area_summaries -%}
+- {% if area.floor %}{{ area.floor }} / {% endif %}{{ area.name }}: {{ area.summary }}
+  ids: {% for entity_ids in area.entity_ids.values() %}{{ entity_ids | join(',') }}{% if not loop.last %},{% endif %}{% endfor %}
+{% endfor -%}
+{% endif %}
 
 The current state of devices is provided in available devices.
 Use the execute_services tool only for requested actions, not for current states.
@@ -26,6 +36,14 @@ Do not restate or appreciate what the user says, rather make a quick inquiry.
 """
 CONF_MODEL = "model"
 DEFAULT_MODEL = "claude-3-5-sonnet-20240620"
+CONF_MODEL_ROUTING = "model_routing"
+DEFAULT_MODEL_ROUTING = False
+CONF_FAST_MODEL = "fast_model"
+DEFAULT_FAST_MODEL = "claude-3-haiku-20240307"
+CONF_ROUTING_MAX_WORDS = "routing_max_words"
+DEFAULT_ROUTING_MAX_WORDS = 12
+CONF_ROUTING_MAX_DEPTH = "routing_max_depth"
+DEFAULT_ROUTING_MAX_DEPTH = 4
 CONF_MAX_TOKENS = "max_tokens"
 DEFAULT_MAX_TOKENS = 1024
 CONF_TEMPERATURE = "temperature"
@@ -34,6 +52,33 @@ CONF_TOP_P = "top_p"
 DEFAULT_TOP_P = 1
 CONF_MAX_TOOL_CALLS_PER_CONVERSATION = "max_tool_calls_per_conversation"
 DEFAULT_MAX_TOOL_CALLS_PER_CONVERSATION = 1
+# Spoken when the tool call limit was reached before the model replied
+TOOL_LIMIT_REPLY = "Sorry, that needs more steps than I am allowed to take."
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+CONF_PROMPT_CACHE = "prompt_cache"
+DEFAULT_PROMPT_CACHE = False
+PROMPT_CACHE_BETA = "prompt-caching-2024-07-31"
+# Seconds a prepared entity snapshot and prompt stay valid for the next turn
+PREPARE_TTL = 15
+CONF_SUPPRESS_NOOP_CALLS = "suppress_noop_calls"
+DEFAULT_SUPPRESS_NOOP_CALLS = False
+# State an entity is left in by a service, calls against entities already in it are no-ops
+NOOP_TARGET_STATES = {
+    "turn_on": "on",
+    "turn_off": "off",
+    "open_cover": "open",
+    "close_cover": "closed",
+    "open_valve": "open",
+    "close_valve": "closed",
+    "lock": "locked",
+    "unlock": "unlocked",
+}
+# Domains whose on/off, open/closed and locked states reflect a single device,
+# groups and scripts are excluded as their state does not say what a call does
+NOOP_DOMAINS = frozenset(
+    {"light", "switch", "fan", "cover", "lock", "valve", "input_boolean"}
+)
 CONF_TOOLS = "tools"
 DEFAULT_CONF_TOOLS = [
     {
@@ -80,9 +125,28 @@ DEFAULT_CONF_TOOLS = [
 ]
 CONF_CONTEXT_THRESHOLD = "context_threshold"
 DEFAULT_CONTEXT_THRESHOLD = 100000  # Anthropic models can handle larger contexts
-CONTEXT_TRUNCATE_STRATEGIES = [{"key": "clear", "label": "Clear All Messages"}]
+CONTEXT_TRUNCATE_STRATEGIES = [
+    {"key": "clear", "label": "Clear All Messages"},
+    {"key": "trim", "label": "Drop Oldest Messages"},
+]
 CONF_CONTEXT_TRUNCATE_STRATEGY = "context_truncate_strategy"
 DEFAULT_CONTEXT_TRUNCATE_STRATEGY = CONTEXT_TRUNCATE_STRATEGIES[0]["key"]
+CONF_DAILY_COST_CAP = "daily_cost_cap"
+DEFAULT_DAILY_COST_CAP = 0.0
+# Share of the context threshold kept once the daily cost cap is reached
+DEGRADED_CONTEXT_RATIO = 0.25
+ENTITY_CONTEXT_MODES = [
+    {"key": "flat", "label": "All exposed entities"},
+    {"key": "hierarchical", "label": "Speaker's area in full, other areas summarized"},
+]
+CONF_ENTITY_CONTEXT = "entity_context"
+DEFAULT_ENTITY_CONTEXT = ENTITY_CONTEXT_MODES[0]["key"]
+EVENT_PAYLOAD_MODES = [
+    {"key": "lean", "label": "Lean (ids, usage, timings, last turn only)"},
+    {"key": "full", "label": "Full transcript"},
+]
+CONF_EVENT_PAYLOAD = "event_payload"
+DEFAULT_EVENT_PAYLOAD = EVENT_PAYLOAD_MODES[0]["key"]
 
 # Configuration constants
 CONF_API_KEY = "api_key"
@@ -90,3 +154,8 @@ CONF_NAME = "name"
 
 # Service constants
 SERVICE_QUERY_IMAGE = "query_image"
+SERVICE_PREPARE = "prepare"
+# Image token budget of a query_image call, shared by all its images
+DEFAULT_MAX_IMAGE_TOKENS = 8000
+# Smallest per image budget, about 270x270 pixels, below which images are of little use
+MIN_IMAGE_TOKENS = 100
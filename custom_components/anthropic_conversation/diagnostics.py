@@ -0,0 +1,22 @@
+"""Diagnostics support for the Anthropic Conversation integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_AGENT, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return per model latency and token stats for tuning routing."""
+    agent = hass.data[DOMAIN][entry.entry_id][DATA_AGENT]
+    return {
+        "options": dict(entry.options),
+        "routing": agent.router.stats(),
+        "queue": agent.scheduler.stats(),
+        "conversations": len(agent.history),
+    }
@@ -0,0 +1,175 @@
+"""Area, floor and device context for exposed entities."""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+    floor_registry as fr,
+)
+
+# States counted as active in the summary of a collapsed area
+ACTIVE_STATES = frozenset({"on", "open", "opening", "unlocked", "playing", "home"})
+
+EMPTY_CONTEXT: dict[str, Any] = {
+    "aliases": [],
+    "area_id": None,
+    "area": None,
+    "floor_id": None,
+    "floor": None,
+    "device_id": None,
+    "device": None,
+}
+
+
+class EntityContextCache:
+    """Join of the entity, device, area and floor registries.
+
+    The join is built once and dropped whenever one of the registries
+    changes, so each turn only does a dict lookup per entity.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self._entities: dict[str, dict[str, Any]] | None = None
+        self._device_areas: dict[str, str | None] | None = None
+
+    @callback
+    def async_setup(self) -> Callable[[], None]:
+        """Listen for registry changes and return a callback to stop."""
+        unsubs = [
+            self.hass.bus.async_listen(event_type, self._async_invalidate)
+            for event_type in (
+                er.EVENT_ENTITY_REGISTRY_UPDATED,
+                dr.EVENT_DEVICE_REGISTRY_UPDATED,
+                ar.EVENT_AREA_REGISTRY_UPDATED,
+                fr.EVENT_FLOOR_REGISTRY_UPDATED,
+            )
+        ]
+
+        @callback
+        def _async_unsub() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return _async_unsub
+
+    @callback
+    def _async_invalidate(self, event: Event) -> None:
+        self._entities = None
+        self._device_areas = None
+
+    def lookup(self, entity_id: str) -> dict[str, Any]:
+        """Return aliases, area, floor and device of an entity."""
+        if self._entities is None:
+            self._build()
+        return self._entities.get(entity_id, EMPTY_CONTEXT)
+
+    def device_area(self, device_id: str | None) -> str | None:
+        """Return the area id of a device."""
+        if device_id is None:
+            return None
+        if self._device_areas is None:
+            self._build()
+        return self._device_areas.get(device_id)
+
+    def _build(self) -> None:
+        entity_registry = er.async_get(self.hass)
+        device_registry = dr.async_get(self.hass)
+        area_registry = ar.async_get(self.hass)
+        floor_registry = fr.async_get(self.hass)
+
+        areas: dict[str, dict[str, Any]] = {}
+        for area in area_registry.async_list_areas():
+            floor = (
+                floor_registry.async_get_floor(area.floor_id)
+                if area.floor_id
+                else None
+            )
+            areas[area.id] = {
+                "area_id": area.id,
+                "area": area.name,
+                "floor_id": area.floor_id,
+                "floor": floor.name if floor else None,
+            }
+
+        self._device_areas = {
+            device.id: device.area_id for device in device_registry.devices.values()
+        }
+
+        entities: dict[str, dict[str, Any]] = {}
+        for entry in entity_registry.entities.values():
+            device = (
+                device_registry.async_get(entry.device_id) if entry.device_id else None
+            )
+            area_id = entry.area_id or (device.area_id if device else None)
+            entities[entry.entity_id] = {
+                **EMPTY_CONTEXT,
+                **areas.get(area_id, {}),
+                "aliases": sorted(entry.aliases) if entry.aliases else [],
+                "device_id": entry.device_id,
+                "device": (device.name_by_user or device.name) if device else None,
+            }
+        self._entities = entities
+
+
+def summarize_areas(
+    exposed_entities: list[dict], current_area_id: str
+) -> tuple[list[dict], list[dict]]:
+    """Split exposed entities into the expanded and the summarized areas.
+
+    Entities in the current area and entities without an area are returned
+    in full. Every other area is collapsed to counts and entity ids per
+    domain, ordered by floor and area name.
+    """
+    expanded = []
+    collapsed: dict[str, dict[str, Any]] = {}
+    for entity in exposed_entities:
+        area_id = entity.get("area_id")
+        if area_id is None or area_id == current_area_id:
+            expanded.append(entity)
+            continue
+        area = collapsed.setdefault(
+            area_id,
+            {
+                "area_id": area_id,
+                "name": entity["area"],
+                "floor": entity["floor"],
+                "domains": Counter(),
+                "active": Counter(),
+                "entity_ids": {},
+            },
+        )
+        domain = entity["entity_id"].split(".", 1)[0]
+        area["domains"][domain] += 1
+        area["entity_ids"].setdefault(domain, []).append(entity["entity_id"])
+        if entity["state"] in ACTIVE_STATES:
+            area["active"][domain] += 1
+
+    summaries = []
+    for area in sorted(
+        collapsed.values(), key=lambda area: (area["floor"] or "", area["name"])
+    ):
+        parts = []
+        for domain, count in sorted(area["domains"].items()):
+            active = area["active"][domain]
+            parts.append(f"{domain}: {count} ({active} on)" if active else f"{domain}: {count}")
+        summaries.append(
+            {
+                "area_id": area["area_id"],
+                "name": area["name"],
+                "floor": area["floor"],
+                "summary": ", ".join(parts),
+                "entity_ids": {
+                    domain: sorted(entity_ids)
+                    for domain, entity_ids in sorted(area["entity_ids"].items())
+                },
+            }
+        )
+    return expanded, summaries
@@ -1,20 +1,25 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
 from datetime import timedelta
+from functools import lru_cache, partial
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from anthropic import Anthropic, APIStatusError, APIConnectionError, APITimeoutError
 import voluptuous as vol
+import yaml
 
 from homeassistant.components import conversation
 from homeassistant.components.homeassistant.exposed_entities import async_should_expose
+from homeassistant.const import ATTR_ENTITY_ID
 from homeassistant.core import HomeAssistant, State
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.importlib import async_import_module
 from homeassistant.helpers.template import Template
 import homeassistant.util.dt as dt_util
 
-from .const import DOMAIN
+from .const import DOMAIN, NOOP_DOMAINS, NOOP_TARGET_STATES
 from .exceptions import (
     CallServiceError,
     EntityNotExposed,
@@ -25,17 +30,37 @@ from .exceptions import (
     InvalidAuth,
 )
 
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
 _LOGGER = logging.getLogger(__name__)
 
-async def validate_authentication(hass: HomeAssistant, api_key: str) -> None:
-    """Validate the API key."""
-    client = Anthropic(api_key=api_key)
+async def async_create_client(hass: HomeAssistant, api_key: str) -> AsyncAnthropic:
+    """Create an Anthropic client.
+
+    The SDK is imported on first use and both the import and the client
+    creation, which loads the SSL context, run in the executor.
+    """
+    anthropic = await async_import_module(hass, "anthropic")
+    return await hass.async_add_executor_job(
+        partial(anthropic.AsyncAnthropic, api_key=api_key)
+    )
+
+async def validate_authentication(hass: HomeAssistant, api_key: str) -> AsyncAnthropic:
+    """Validate the API key and return the client.
+
+    The pinned SDK has no models resource, the endpoint is requested directly.
+    """
+    anthropic = await async_import_module(hass, "anthropic")
+    httpx = await async_import_module(hass, "httpx")
+    client = await async_create_client(hass, api_key)
     try:
-        await client.models.list()
-    except APIStatusError as err:
+        await client.get("/v1/models", cast_to=httpx.Response)
+    except anthropic.APIStatusError as err:
         raise InvalidAuth(f"Invalid API key: {err}") from err
-    except (APIConnectionError, APITimeoutError) as err:
+    except (anthropic.APIConnectionError, anthropic.APITimeoutError) as err:
         raise CannotConnect(f"Unable to connect to Anthropic API: {err}") from err
+    return client
 
 def get_exposed_entities(hass: HomeAssistant):
     """Get the exposed entities."""
@@ -64,6 +89,134 @@ def get_exposed_entities(hass: HomeAssistant):
         )
     return exposed_entities
 
+def split_system_message(messages: list[dict]) -> tuple[str, list[dict]]:
+    """Split the stored history into the Messages API system and messages."""
+    if messages and messages[0]["role"] == "system":
+        return messages[0]["content"], messages[1:]
+    return "", messages
+
+@lru_cache(maxsize=8)
+def load_tools(raw_tools: str) -> list[dict]:
+    """Parse the tools option, cached as it is read on every request."""
+    return convert_tools(yaml.safe_load(raw_tools) or [])
+
+def convert_tools(tools: list[dict]) -> list[dict]:
+    """Convert function style tool definitions to Messages API tools."""
+    converted = []
+    for tool in tools:
+        function = tool.get("function")
+        if function is None:
+            converted.append(tool)
+            continue
+        converted.append(
+            {
+                "name": function["name"],
+                "description": function.get("description", ""),
+                "input_schema": function.get(
+                    "parameters", {"type": "object", "properties": {}}
+                ),
+            }
+        )
+    return converted
+
+def tool_failed(tool_response: dict) -> bool:
+    """Return True if a tool response reports an error."""
+    if "error" in tool_response:
+        return True
+    return any(not result.get("success", True) for result in tool_response.get("results", []))
+
+def sum_usage(usages: list) -> dict[str, int] | None:
+    """Add up the token counts of the responses of one turn."""
+    if not usages:
+        return None
+    total: dict[str, int] = {}
+    for usage in usages:
+        for key, value in usage.model_dump().items():
+            if isinstance(value, int):
+                total[key] = total.get(key, 0) + value
+    return total
+
+def build_conversation_event_data(
+    mode: str,
+    agent_id: str,
+    conversation_id: str,
+    user_input: conversation.ConversationInput,
+    response,
+    usage: dict[str, int] | None,
+    messages: list[dict],
+    turn_start: int,
+    timings: dict[str, float],
+    queue: dict[str, Any],
+) -> dict[str, Any]:
+    """Build the event data fired on conversation finished.
+
+    The lean payload only carries the last turn so bus listeners and the
+    recorder never see the system prompt or the full history. usage is
+    the total of every request of the turn, response is the last one.
+    """
+    turn = [dict(message) for message in messages[turn_start:]]
+    data = {
+        "agent_id": agent_id,
+        "conversation_id": conversation_id,
+        "device_id": user_input.device_id,
+        "language": user_input.language,
+        "response_id": getattr(response, "id", None),
+        "model": getattr(response, "model", None),
+        "stop_reason": getattr(response, "stop_reason", None),
+        "usage": usage,
+        "timings": timings,
+        "queue": queue,
+        "tool_results": [
+            block["content"]
+            for message in turn
+            if message["role"] == "user" and isinstance(message["content"], list)
+            for block in message["content"]
+            if block.get("type") == "tool_result"
+        ],
+        "turn": turn,
+    }
+    if mode == "full":
+        data["response"] = response.model_dump()
+        data["user_input"] = {
+            "text": user_input.text,
+            "conversation_id": user_input.conversation_id,
+            "device_id": user_input.device_id,
+            "language": user_input.language,
+        }
+        data["messages"] = [dict(message) for message in messages]
+    return data
+
+def exposed_entity_ids(exposed_entities) -> frozenset[str]:
+    """Return the ids of the exposed entities for O(1) membership checks."""
+    return frozenset(entity["entity_id"] for entity in exposed_entities)
+
+def split_noop_entity_ids(
+    hass: HomeAssistant, service: str, service_data: dict, entity_ids: list[str]
+) -> tuple[list[str], list[str]]:
+    """Split entity ids into those the service changes and those already there.
+
+    Only plain state changes of single devices are considered. A call with
+    extra data such as a brightness is never a no-op, and neither is one on
+    a group, whose state is on as soon as any member is on.
+    """
+    target_state = NOOP_TARGET_STATES.get(service)
+    if target_state is None or set(service_data) - {"entity_id"}:
+        return entity_ids, []
+    changed = []
+    skipped = []
+    for entity_id in entity_ids:
+        state = hass.states.get(entity_id)
+        if (
+            state is not None
+            and state.domain in NOOP_DOMAINS
+            and ATTR_ENTITY_ID not in state.attributes
+            and state.state == target_state
+        ):
+            skipped.append(entity_id)
+        else:
+            changed.append(entity_id)
+    return changed, skipped
+
 class FunctionExecutor(ABC):
     def __init__(self, data_schema=vol.Schema({})) -> None:
         """Initialize function executor."""
@@ -80,11 +233,12 @@ class FunctionExecutor(ABC):
             )
             raise InvalidFunction(function_type) from e
 
-    def validate_entity_ids(self, hass: HomeAssistant, entity_ids, exposed_entities):
+    def validate_entity_ids(
+        self, hass: HomeAssistant, entity_ids, exposed_entity_ids: frozenset[str]
+    ):
         if any(hass.states.get(entity_id) is None for entity_id in entity_ids):
             raise EntityNotFound(entity_ids)
-        exposed_entity_ids = map(lambda e: e["entity_id"], exposed_entities)
-        if not set(entity_ids).issubset(exposed_entity_ids):
+        if not exposed_entity_ids.issuperset(entity_ids):
             raise EntityNotExposed(entity_ids)
 
     @abstractmethod
@@ -110,11 +264,12 @@ class NativeFunctionExecutor(FunctionExecutor):
         arguments,
         user_input: conversation.ConversationInput,
         exposed_entities,
+        suppress_noop: bool = False,
     ):
         name = function["name"]
         if name == "execute_services":
             return await self.execute_service(
-                hass, function, arguments, user_input, exposed_entities
+                hass, function, arguments, user_input, exposed_entities, suppress_noop
             )
         raise FunctionNotFound(name)
 
@@ -125,12 +280,19 @@ class NativeFunctionExecutor(FunctionExecutor):
         arguments,
         user_input: conversation.ConversationInput,
         exposed_entities,
+        suppress_noop: bool = False,
     ):
+        exposed_ids = exposed_entity_ids(exposed_entities)
         result = []
         for service_argument in arguments.get("list", []):
             result.append(
                 await self.execute_service_single(
-                    hass, function, service_argument, user_input, exposed_entities
+                    hass,
+                    function,
+                    service_argument,
+                    user_input,
+                    exposed_ids,
+                    suppress_noop,
                 )
             )
         return result
@@ -141,7 +303,8 @@ class NativeFunctionExecutor(FunctionExecutor):
         function,
         service_argument,
         user_input: conversation.ConversationInput,
-        exposed_entities,
+        exposed_ids: frozenset[str],
+        suppress_noop: bool = False,
     ):
         domain = service_argument["domain"]
         service = service_argument["service"]
@@ -158,14 +321,26 @@ class NativeFunctionExecutor(FunctionExecutor):
             raise CallServiceError(domain, service, service_data)
         if not hass.services.has_service(domain, service):
             raise FunctionNotFound(f"Service {domain}.{service} not found")
-        self.validate_entity_ids(hass, entity_id or [], exposed_entities)
+        self.validate_entity_ids(hass, entity_id or [], exposed_ids)
+
+        skipped = []
+        if suppress_noop:
+            entity_id, skipped = split_noop_entity_ids(
+                hass, service, service_data, entity_id
+            )
+            if not entity_id:
+                return {"success": True, "skipped": skipped}
+            service_data["entity_id"] = entity_id
 
         try:
             await hass.services.async_call(
                 domain=domain,
                 service=service,
                 service_data=service_data,
+                context=user_input.context,
             )
+            if skipped:
+                return {"success": True, "skipped": skipped}
             return {"success": True}
         except Exception as e:
             _LOGGER.error(e)
@@ -0,0 +1,86 @@
+"""Image fetching and sizing for the query_image service."""
+from __future__ import annotations
+
+import base64
+import io
+import math
+import time
+from typing import Any
+
+from PIL import Image
+
+from homeassistant.components import camera, image
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+# Anthropic bills roughly width * height / 750 tokens per image
+PIXELS_PER_TOKEN = 750
+# Longer edges are downscaled by the API anyway, so never send more
+MAX_EDGE = 1568
+JPEG_QUALITY = 85
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Return the estimated token cost of an image."""
+    return math.ceil(width * height / PIXELS_PER_TOKEN)
+
+
+async def async_fetch_image(hass: HomeAssistant, source: dict[str, str]) -> dict[str, Any]:
+    """Fetch the bytes of an image given by url or camera/image entity id."""
+    started = time.monotonic()
+    if "url" in source:
+        session = async_get_clientsession(hass)
+        async with session.get(source["url"]) as response:
+            response.raise_for_status()
+            content = await response.read()
+        name = source["url"]
+    else:
+        entity_id = source["entity_id"]
+        if entity_id.startswith(f"{camera.DOMAIN}."):
+            snapshot = await camera.async_get_image(hass, entity_id)
+        elif entity_id.startswith(f"{image.DOMAIN}."):
+            snapshot = await image.async_get_image(hass, entity_id)
+        else:
+            raise HomeAssistantError(f"{entity_id} is not a camera or image entity")
+        content = snapshot.content
+        name = entity_id
+    return {
+        "source": name,
+        "content": content,
+        "fetch_time": time.monotonic() - started,
+    }
+
+
+def fit_image(content: bytes, max_tokens: int) -> dict[str, Any]:
+    """Downscale an image to fit a token budget and encode it for the API.
+
+    Must run in the executor as decoding and encoding are CPU bound.
+    """
+    started = time.monotonic()
+    with Image.open(io.BytesIO(content)) as img:
+        source_format = img.format
+        original = img.size
+        width, height = img.size
+        scale = min(
+            1.0,
+            MAX_EDGE / max(width, height),
+            math.sqrt(max_tokens * PIXELS_PER_TOKEN / (width * height)),
+        )
+        if scale < 1.0:
+            width = max(1, int(width * scale))
+            height = max(1, int(height * scale))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+        # Everything not sent as is is re-encoded as JPEG
+        if scale < 1.0 or source_format != "JPEG":
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, format="JPEG", quality=JPEG_QUALITY)
+            content = buffer.getvalue()
+    return {
+        "data": base64.b64encode(content).decode(),
+        "media_type": "image/jpeg",
+        "original_size": original,
+        "size": (width, height),
+        "tokens": image_tokens(width, height),
+        "prepare_time": time.monotonic() - started,
+    }
@@ -0,0 +1,174 @@
+"""Model routing for the Anthropic Conversation agent."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Mapping
+import logging
+import re
+from typing import Any
+
+from .const import (
+    CONF_FAST_MODEL,
+    CONF_MODEL,
+    CONF_MODEL_ROUTING,
+    CONF_ROUTING_MAX_DEPTH,
+    CONF_ROUTING_MAX_WORDS,
+    DEFAULT_FAST_MODEL,
+    DEFAULT_MODEL,
+    DEFAULT_MODEL_ROUTING,
+    DEFAULT_ROUTING_MAX_DEPTH,
+    DEFAULT_ROUTING_MAX_WORDS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Words that hint at reasoning or conditional logic rather than a direct command
+ESCALATION_WORDS = frozenset(
+    {
+        "because",
+        "compare",
+        "explain",
+        "if",
+        "plan",
+        "schedule",
+        "summarise",
+        "summarize",
+        "then",
+        "unless",
+        "until",
+        "why",
+    }
+)
+# Number of "and" conjunctions at which a request needs several tool calls
+MAX_SIMPLE_CLAUSES = 2
+LATENCY_WINDOW = 200
+# Conversations whose last turn failed that are remembered, oldest dropped first
+MAX_FAILED_CONVERSATIONS = 100
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+class ModelStats:
+    """Latency and token counters for one model."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a dict."""
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        }
+
+
+class ModelRouter:
+    """Pick a fast model for simple turns and the configured model otherwise.
+
+    A turn goes to the large model when the utterance is long, asks for
+    reasoning, chains several actions, the conversation is deep, or the
+    previous turn of the conversation failed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the router."""
+        # Insertion ordered, used as a bounded ordered set
+        self._failed: dict[str, None] = {}
+        self.models: dict[str, ModelStats] = {}
+        self.reasons: dict[str, int] = {}
+
+    def select(
+        self,
+        options: Mapping[str, Any],
+        conversation_id: str | None,
+        text: str,
+        depth: int,
+        degraded: bool = False,
+    ) -> str:
+        """Return the model to use for a turn.
+
+        A degraded turn, e.g. over the daily cost cap, always gets the fast
+        model.
+        """
+        large_model = options.get(CONF_MODEL, DEFAULT_MODEL)
+        if degraded:
+            self.reasons["degraded"] = self.reasons.get("degraded", 0) + 1
+            return options.get(CONF_FAST_MODEL, DEFAULT_FAST_MODEL)
+        if not options.get(CONF_MODEL_ROUTING, DEFAULT_MODEL_ROUTING):
+            return large_model
+
+        reason = self._escalation_reason(options, conversation_id, text, depth)
+        self.reasons[reason or "simple"] = self.reasons.get(reason or "simple", 0) + 1
+        if reason is None:
+            return options.get(CONF_FAST_MODEL, DEFAULT_FAST_MODEL)
+        _LOGGER.debug("Routing to %s: %s", large_model, reason)
+        return large_model
+
+    def default_model(self, options: Mapping[str, Any]) -> str:
+        """Return the model most turns are routed to, e.g. for cache warming."""
+        if options.get(CONF_MODEL_ROUTING, DEFAULT_MODEL_ROUTING):
+            return options.get(CONF_FAST_MODEL, DEFAULT_FAST_MODEL)
+        return options.get(CONF_MODEL, DEFAULT_MODEL)
+
+    def escalate(self, options: Mapping[str, Any], conversation_id: str | None) -> str:
+        """Return the large model after the fast model failed within a turn."""
+        self.record_failure(conversation_id)
+        self.reasons["tool_failure"] = self.reasons.get("tool_failure", 0) + 1
+        return options.get(CONF_MODEL, DEFAULT_MODEL)
+
+    def _escalation_reason(
+        self,
+        options: Mapping[str, Any],
+        conversation_id: str | None,
+        text: str,
+        depth: int,
+    ) -> str | None:
+        words = [word.lower() for word in _WORD_RE.findall(text)]
+        if conversation_id in self._failed:
+            return "prior_failure"
+        if len(words) > options.get(CONF_ROUTING_MAX_WORDS, DEFAULT_ROUTING_MAX_WORDS):
+            return "length"
+        if depth > options.get(CONF_ROUTING_MAX_DEPTH, DEFAULT_ROUTING_MAX_DEPTH):
+            return "depth"
+        if ESCALATION_WORDS.intersection(words):
+            return "reasoning"
+        if words.count("and") >= MAX_SIMPLE_CLAUSES:
+            return "multiple_actions"
+        return None
+
+    def record_failure(self, conversation_id: str | None) -> None:
+        """Remember that the last turn of a conversation failed."""
+        if conversation_id is None:
+            return
+        self._failed.pop(conversation_id, None)
+        self._failed[conversation_id] = None
+        if len(self._failed) > MAX_FAILED_CONVERSATIONS:
+            del self._failed[next(iter(self._failed))]
+
+    def record_success(self, conversation_id: str | None) -> None:
+        """Forget an earlier failure of a conversation."""
+        self._failed.pop(conversation_id, None)
+
+    def record_response(self, model: str, latency: float, usage) -> None:
+        """Record latency and token usage of one API call."""
+        stats = self.models.setdefault(model, ModelStats())
+        stats.requests += 1
+        stats.latencies.append(latency)
+        if usage is not None:
+            stats.input_tokens += usage.input_tokens
+            stats.output_tokens += usage.output_tokens
+
+    def stats(self) -> dict[str, Any]:
+        """Return per model latency and token stats and routing decisions."""
+        return {
+            "models": {model: stats.as_dict() for model, stats in self.models.items()},
+            "reasons": dict(self.reasons),
+        }
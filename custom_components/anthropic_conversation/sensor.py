@@ -0,0 +1,127 @@
+"""Usage sensors for the Anthropic Conversation integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DATA_AGENT, DOMAIN, SIGNAL_USAGE_UPDATED
+from .usage import UsageTracker
+
+
+@dataclass(frozen=True, kw_only=True)
+class UsageSensorEntityDescription(SensorEntityDescription):
+    """Describes an Anthropic usage sensor."""
+
+    value_fn: Callable[[UsageTracker], float | int]
+    daily: bool = True
+
+
+SENSORS: tuple[UsageSensorEntityDescription, ...] = (
+    UsageSensorEntityDescription(
+        key="cost_today",
+        name="Cost today",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="USD",
+        suggested_display_precision=4,
+        value_fn=lambda usage: usage.cost_today,
+    ),
+    UsageSensorEntityDescription(
+        key="cost_total",
+        name="Cost total",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="USD",
+        suggested_display_precision=4,
+        value_fn=lambda usage: usage.cost_total,
+        daily=False,
+    ),
+    UsageSensorEntityDescription(
+        key="input_tokens_today",
+        name="Input tokens today",
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="tokens",
+        value_fn=lambda usage: usage.input_tokens_today,
+    ),
+    UsageSensorEntityDescription(
+        key="output_tokens_today",
+        name="Output tokens today",
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement="tokens",
+        value_fn=lambda usage: usage.output_tokens_today,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the usage sensors."""
+    usage = hass.data[DOMAIN][entry.entry_id][DATA_AGENT].usage
+    async_add_entities(
+        AnthropicUsageSensor(entry, usage, description) for description in SENSORS
+    )
+
+
+class AnthropicUsageSensor(SensorEntity):
+    """Token or cost counter of one config entry."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    entity_description: UsageSensorEntityDescription
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        usage: UsageTracker,
+        description: UsageSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._usage = usage
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer="Anthropic",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self) -> float | int:
+        """Return the counter value."""
+        return self.entity_description.value_fn(self._usage)
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Return the start of the current day for daily counters."""
+        return self._usage.day_start if self.entity_description.daily else None
+
+    async def async_added_to_hass(self) -> None:
+        """Update when usage is recorded."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_USAGE_UPDATED.format(self._usage.entry_id),
+                self._async_usage_updated,
+            )
+        )
+
+    @callback
+    def _async_usage_updated(self) -> None:
+        self.async_write_ha_state()
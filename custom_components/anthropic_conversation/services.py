@@ -1,16 +1,31 @@
 """Services for the Anthropic Conversation integration."""
+from __future__ import annotations
+
+import asyncio
 import logging
+import time
+from typing import TYPE_CHECKING
 
 import voluptuous as vol
-from anthropic import AsyncAnthropic
-from anthropic.types import ContentBlockImage, ContentBlock
 
 from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers import selector, config_validation as cv
+from homeassistant.helpers.importlib import async_import_module
+
+from .const import (
+    DOMAIN,
+    SERVICE_QUERY_IMAGE,
+    SERVICE_PREPARE,
+    DEFAULT_MODEL,
+    DEFAULT_MAX_IMAGE_TOKENS,
+    MIN_IMAGE_TOKENS,
+    DATA_AGENT,
+)
 
-from .const import DOMAIN, SERVICE_QUERY_IMAGE, DEFAULT_MODEL, CONF_API_KEY
+if TYPE_CHECKING:
+    from . import AnthropicAgent
 
 _LOGGER = logging.getLogger(__package__)
 
@@ -23,48 +38,162 @@ QUERY_IMAGE_SCHEMA = vol.Schema(
         ),
         vol.Optional("model", default=DEFAULT_MODEL): cv.string,
         vol.Required("prompt"): cv.string,
-        vol.Required("images"): vol.All(cv.ensure_list, [{"url": cv.url}]),
+        vol.Optional("images", default=[]): vol.All(cv.ensure_list, [{"url": cv.url}]),
+        vol.Optional("entity_id", default=[]): cv.entity_ids,
         vol.Optional("max_tokens", default=1024): cv.positive_int,
+        vol.Optional(
+            "max_image_tokens", default=DEFAULT_MAX_IMAGE_TOKENS
+        ): vol.All(vol.Coerce(int), vol.Range(min=MIN_IMAGE_TOKENS)),
+        vol.Optional("max_images_per_request", default=0): cv.positive_int,
+    }
+)
+
+PREPARE_SCHEMA = vol.Schema(
+    {
+        vol.Required("config_entry"): selector.ConfigEntrySelector(
+            {
+                "integration": DOMAIN,
+            }
+        ),
+        vol.Optional("device_id"): cv.string,
+        vol.Optional("conversation_id"): cv.string,
     }
 )
 
+async def _async_query_batch(agent: AnthropicAgent, data, images) -> tuple[dict, float]:
+    """Ask about one batch of images and return the response and its duration."""
+    content = [
+        *(
+            {
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": image["media_type"],
+                    "data": image["data"],
+                },
+            }
+            for image in images
+        ),
+        {"type": "text", "text": data["prompt"]},
+    ]
+    _LOGGER.info("Prompt for %s: %s with %d images", data["model"], data["prompt"], len(images))
+    started = time.monotonic()
+    response = await agent.client.messages.create(
+        model=data["model"],
+        max_tokens=data["max_tokens"],
+        messages=[{"role": "user", "content": content}],
+    )
+    agent.usage.async_record(data["model"], response.usage)
+    return response.model_dump(), time.monotonic() - started
+
+def merge_responses(responses: list[dict]) -> dict:
+    """Merge the responses of parallel image requests into one message."""
+    if len(responses) == 1:
+        return responses[0]
+    merged = dict(responses[0])
+    merged["content"] = [block for response in responses for block in response["content"]]
+    merged["stop_reason"] = responses[-1]["stop_reason"]
+    merged["usage"] = {
+        key: sum(response["usage"].get(key) or 0 for response in responses)
+        for key in ("input_tokens", "output_tokens")
+    }
+    merged["responses"] = responses
+    return merged
+
+
 async def async_setup_services(hass: HomeAssistant, config: ConfigType) -> None:
     """Set up services for the Anthropic conversation component."""
 
     async def query_image(call: ServiceCall) -> ServiceResponse:
         """Query an image."""
+        sources = [*call.data["images"]] + [
+            {"entity_id": entity_id} for entity_id in call.data["entity_id"]
+        ]
+        if not sources:
+            raise HomeAssistantError("No images or camera entities given")
+        per_request = call.data["max_images_per_request"] or len(sources)
+        # The budget covers the whole call, split evenly over all its images
+        budget = call.data["max_image_tokens"] // len(sources)
+        if budget < MIN_IMAGE_TOKENS:
+            raise HomeAssistantError(
+                f"max_image_tokens of {call.data['max_image_tokens']} leaves "
+                f"{budget} tokens per image, at least {MIN_IMAGE_TOKENS} are needed. "
+                "Raise it or send fewer images"
+            )
         try:
-            model = call.data["model"]
-            images = [
-                ContentBlockImage(type="image", source={"type": "url", "url": image["url"]})
-                for image in call.data["images"]
-            ]
-
-            content: list[ContentBlock] = [
-                {"type": "text", "text": call.data["prompt"]},
-                *images
-            ]
-
-            _LOGGER.info("Prompt for %s: %s", model, content)
-
-            client = AsyncAnthropic(api_key=hass.data[DOMAIN][call.data["config_entry"]][CONF_API_KEY])
-            response = await client.messages.create(
-                model=model,
-                max_tokens=call.data["max_tokens"],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content,
-                    }
-                ],
+            agent = hass.data[DOMAIN][call.data["config_entry"]][DATA_AGENT]
+        except KeyError as err:
+            raise HomeAssistantError(
+                f"Config entry {call.data['config_entry']} is not loaded"
+            ) from err
+
+        # Pillow and the camera and image components are only needed here
+        images = await async_import_module(hass, f"{__package__}.images")
+
+        try:
+            started = time.monotonic()
+            fetched = await asyncio.gather(
+                *(images.async_fetch_image(hass, source) for source in sources)
+            )
+            prepared = await asyncio.gather(
+                *(
+                    hass.async_add_executor_job(
+                        images.fit_image, image["content"], budget
+                    )
+                    for image in fetched
+                )
+            )
+            responses = await asyncio.gather(
+                *(
+                    _async_query_batch(
+                        agent, call.data, prepared[index : index + per_request]
+                    )
+                    for index in range(0, len(prepared), per_request)
+                )
             )
-            response_dict = response.model_dump()
-            _LOGGER.info("Response %s", response_dict)
         except Exception as err:
             raise HomeAssistantError(f"Error querying image: {err}") from err
 
+        response_dict = merge_responses([response for response, _ in responses])
+        response_dict["images"] = [
+            {
+                "source": image["source"],
+                "request": index // per_request,
+                "original_size": list(fitted["original_size"]),
+                "size": list(fitted["size"]),
+                "tokens": fitted["tokens"],
+                "fetch_time": image["fetch_time"],
+                "prepare_time": fitted["prepare_time"],
+                "query_time": responses[index // per_request][1],
+            }
+            for index, (image, fitted) in enumerate(zip(fetched, prepared))
+        ]
+        response_dict["total_time"] = time.monotonic() - started
+        _LOGGER.info("Response %s", response_dict)
         return response_dict
 
+    async def prepare(call: ServiceCall) -> None:
+        """Prepare the agent for an upcoming turn."""
+        try:
+            agent = hass.data[DOMAIN][call.data["config_entry"]][DATA_AGENT]
+        except KeyError as err:
+            raise HomeAssistantError(
+                f"Config entry {call.data['config_entry']} is not loaded"
+            ) from err
+        # Run in the background so a wake word automation is never held up.
+        hass.async_create_task(
+            agent.async_prepare(
+                call.data.get("device_id"), call.data.get("conversation_id")
+            )
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PREPARE,
+        prepare,
+        schema=PREPARE_SCHEMA,
+    )
+
     hass.services.async_register(
         DOMAIN,
         SERVICE_QUERY_IMAGE,
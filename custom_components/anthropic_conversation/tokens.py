@@ -0,0 +1,142 @@
+"""Local token estimation and pricing for the Anthropic Conversation agent."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Average characters per token of Claude models on English text and JSON
+CHARS_PER_TOKEN = 3.5
+# Per message framing the API adds around the content
+MESSAGE_OVERHEAD = 4
+# Fixed prompt the API adds when tools are present
+TOOLS_OVERHEAD = 300
+# Weight of the latest observation in the estimate correction
+CALIBRATION_WEIGHT = 0.1
+IMAGE_TOKENS = 1600
+
+# USD per million input and output tokens, matched by model prefix
+MODEL_PRICES = {
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-opus": (15.0, 75.0),
+    "claude-3-sonnet": (3.0, 15.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+DEFAULT_PRICE = MODEL_PRICES["claude-3-5-sonnet"]
+CACHE_WRITE_FACTOR = 1.25
+CACHE_READ_FACTOR = 0.1
+
+
+def _content_chars(content: Any) -> int:
+    if isinstance(content, str):
+        return len(content)
+    chars = 0
+    for block in content:
+        if block.get("type") == "image":
+            chars += int(IMAGE_TOKENS * CHARS_PER_TOKEN)
+        elif block.get("type") == "text":
+            chars += len(block["text"])
+        elif block.get("type") == "tool_result":
+            chars += _content_chars(block.get("content", ""))
+        else:
+            chars += len(json.dumps(block.get("input", block), default=str))
+    return chars
+
+
+class TokenEstimator:
+    """Estimate request tokens before sending them.
+
+    The raw character based estimate is scaled by a correction factor that
+    follows the input tokens the API actually billed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the estimator."""
+        self.correction = 1.0
+
+    def message_tokens(self, message: dict) -> int:
+        """Return the estimated tokens of one message."""
+        raw = _content_chars(message["content"]) / CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+        return int(raw * self.correction)
+
+    def tools_tokens(self, tools: list[dict]) -> int:
+        """Return the estimated tokens of the tool definitions."""
+        if not tools:
+            return 0
+        raw = len(json.dumps(tools)) / CHARS_PER_TOKEN + TOOLS_OVERHEAD
+        return int(raw * self.correction)
+
+    def estimate(self, messages: list[dict], tools: list[dict]) -> int:
+        """Return the estimated input tokens of a request."""
+        return self.tools_tokens(tools) + sum(
+            self.message_tokens(message) for message in messages
+        )
+
+    def calibrate(self, estimated: int, actual: int) -> None:
+        """Move the correction factor towards the billed token count."""
+        if estimated <= 0 or actual <= 0:
+            return
+        observed = self.correction * actual / estimated
+        self.correction += CALIBRATION_WEIGHT * (observed - self.correction)
+
+
+def truncate_messages(
+    messages: list[dict],
+    strategy: str,
+    threshold: int,
+    estimator: TokenEstimator,
+    tools: list[dict],
+) -> list[dict]:
+    """Shorten the history so the request fits threshold tokens.
+
+    The system message and the current turn are always kept. "clear" drops
+    every earlier turn, "trim" drops the oldest whole turns until the
+    estimate fits so tool use and tool result blocks stay paired.
+    """
+    system = messages[:1] if messages and messages[0]["role"] == "system" else []
+    history = messages[len(system) :]
+    turn_starts = [
+        index
+        for index, message in enumerate(history)
+        if message["role"] == "user" and isinstance(message["content"], str)
+    ]
+    if len(turn_starts) < 2:
+        return messages
+    if strategy == "clear":
+        return system + history[turn_starts[-1] :]
+
+    total = estimator.estimate(messages, tools)
+    start = 0
+    for turn_start in turn_starts[1:]:
+        if total <= threshold:
+            break
+        total -= sum(
+            estimator.message_tokens(message) for message in history[start:turn_start]
+        )
+        start = turn_start
+    return system + history[start:]
+
+
+def usage_cost(model: str, usage) -> float:
+    """Return the USD cost of the usage of one response."""
+    input_price, output_price = next(
+        (price for prefix, price in MODEL_PRICES.items() if model.startswith(prefix)),
+        DEFAULT_PRICE,
+    )
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    return (
+        usage.input_tokens * input_price
+        + cache_write * input_price * CACHE_WRITE_FACTOR
+        + cache_read * input_price * CACHE_READ_FACTOR
+        + usage.output_tokens * output_price
+    ) / 1_000_000
+
+
+def billed_input_tokens(usage) -> int:
+    """Return all input tokens of a response including cached ones."""
+    return (
+        usage.input_tokens
+        + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+        + (getattr(usage, "cache_read_input_tokens", None) or 0)
+    )
@@ -0,0 +1,106 @@
+"""Running token and cost counters for the Anthropic Conversation agent."""
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, SIGNAL_USAGE_UPDATED
+from .tokens import billed_input_tokens, usage_cost
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+
+class UsageTracker:
+    """Per config entry token and cost counters, reset daily and persisted."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.entry_id = entry_id
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.usage"
+        )
+        self.day_start = dt_util.start_of_local_day()
+        self.cost_today = 0.0
+        self.cost_total = 0.0
+        self.input_tokens_today = 0
+        self.output_tokens_today = 0
+
+    async def async_load(self) -> None:
+        """Restore the counters from storage."""
+        if (data := await self._store.async_load()) is None:
+            return
+        self.cost_total = data["cost_total"]
+        day_start = dt_util.parse_datetime(data["day_start"])
+        if day_start == self.day_start:
+            self.cost_today = data["cost_today"]
+            self.input_tokens_today = data["input_tokens_today"]
+            self.output_tokens_today = data["output_tokens_today"]
+
+    async def async_flush(self) -> None:
+        """Write the counters now instead of after the save delay."""
+        await self._store.async_save(self._data_to_save())
+
+    @callback
+    def async_setup(self) -> CALLBACK_TYPE:
+        """Reset the daily counters at midnight and return the unsubscribe."""
+        return async_track_time_change(
+            self.hass, self._async_midnight, hour=0, minute=0, second=0
+        )
+
+    @callback
+    def _async_midnight(self, now: datetime) -> None:
+        if self._async_roll_over(now):
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            async_dispatcher_send(self.hass, SIGNAL_USAGE_UPDATED.format(self.entry_id))
+
+    @callback
+    def _async_roll_over(self, now: datetime) -> bool:
+        """Start a new day if now is past the current one, return True if so."""
+        day_start = dt_util.start_of_local_day(now)
+        if day_start == self.day_start:
+            return False
+        self.day_start = day_start
+        self.cost_today = 0.0
+        self.input_tokens_today = 0
+        self.output_tokens_today = 0
+        return True
+
+    @callback
+    def async_record(self, model: str, usage) -> float:
+        """Add the usage of one response and return its cost."""
+        self._async_roll_over(dt_util.now())
+        cost = usage_cost(model, usage)
+        self.cost_today += cost
+        self.cost_total += cost
+        self.input_tokens_today += billed_input_tokens(usage)
+        self.output_tokens_today += usage.output_tokens
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        async_dispatcher_send(self.hass, SIGNAL_USAGE_UPDATED.format(self.entry_id))
+        return cost
+
+    @callback
+    def async_over_cap(self, daily_cap: float) -> bool:
+        """Return True if today's cost reached the daily cap (0 disables it)."""
+        self._async_roll_over(dt_util.now())
+        return daily_cap > 0 and self.cost_today >= daily_cap
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "day_start": self.day_start.isoformat(),
+            "cost_today": self.cost_today,
+            "cost_total": self.cost_total,
+            "input_tokens_today": self.input_tokens_today,
+            "output_tokens_today": self.output_tokens_today,
+        }
@@ -0,0 +1,58 @@
+"""Tests for the Anthropic Conversation integration."""
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+from homeassistant.components import conversation
+from homeassistant.core import Context
+
+
+def text_message(text: str, input_tokens: int = 100, output_tokens: int = 10) -> Message:
+    """Return a Messages API response with a text reply."""
+    return Message(
+        id="msg_text",
+        type="message",
+        role="assistant",
+        model="claude-3-5-sonnet-20240620",
+        content=[TextBlock(type="text", text=text)],
+        stop_reason="end_turn",
+        stop_sequence=None,
+        usage=Usage(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+def tool_use_message(
+    tool_use_id: str,
+    service_calls: list[dict],
+    input_tokens: int = 100,
+    output_tokens: int = 20,
+) -> Message:
+    """Return a Messages API response only calling the execute_services tool."""
+    return Message(
+        id=f"msg_{tool_use_id}",
+        type="message",
+        role="assistant",
+        model="claude-3-5-sonnet-20240620",
+        content=[
+            ToolUseBlock(
+                type="tool_use",
+                id=tool_use_id,
+                name="execute_services",
+                input={"list": service_calls},
+            ),
+        ],
+        stop_reason="tool_use",
+        stop_sequence=None,
+        usage=Usage(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+def user_input(
+    text: str, conversation_id: str | None = None, device_id: str | None = None
+) -> conversation.ConversationInput:
+    """Return the input of a conversation turn."""
+    return conversation.ConversationInput(
+        text=text,
+        context=Context(),
+        conversation_id=conversation_id,
+        device_id=device_id,
+        language="en",
+    )
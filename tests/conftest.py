@@ -0,0 +1,49 @@
+"""Fixtures for the Anthropic Conversation tests."""
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.components import conversation
+from homeassistant.components.homeassistant.exposed_entities import (
+    async_expose_entity,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.const import DOMAIN
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading the integration from custom_components."""
+    yield
+
+
+@pytest.fixture
+def mock_client() -> MagicMock:
+    """Return an Anthropic client whose requests are mocked."""
+    client = MagicMock()
+    client.messages.create = AsyncMock()
+    client.get = AsyncMock()
+    return client
+
+
+@pytest.fixture
+async def make_agent(
+    hass: HomeAssistant, mock_client: MagicMock
+) -> Callable[..., AnthropicAgent]:
+    """Return a factory for agents with an exposed light and the mocked client."""
+    assert await async_setup_component(hass, "homeassistant", {})
+    hass.states.async_set("light.desk", "off", {"friendly_name": "Desk"})
+    async_expose_entity(hass, conversation.DOMAIN, "light.desk", True)
+
+    def _make_agent(options: dict[str, Any] | None = None) -> AnthropicAgent:
+        entry = MockConfigEntry(domain=DOMAIN, options=options or {})
+        entry.add_to_hass(hass)
+        return AnthropicAgent(hass, entry, mock_client)
+
+    return _make_agent
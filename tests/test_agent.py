@@ -0,0 +1,161 @@
+"""Tests for the Anthropic Conversation agent."""
+import asyncio
+from collections.abc import Callable
+import copy
+from unittest.mock import MagicMock
+
+from anthropic.types import Message
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+from homeassistant.core import Event, HomeAssistant, callback
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.const import (
+    CONF_MAX_TOOL_CALLS_PER_CONVERSATION,
+    EVENT_CONVERSATION_FINISHED,
+    TOOL_LIMIT_REPLY,
+)
+
+from . import text_message, tool_use_message, user_input
+
+
+async def test_result_returned_before_event_listeners(
+    hass: HomeAssistant,
+    make_agent: Callable[..., AnthropicAgent],
+    mock_client: MagicMock,
+) -> None:
+    """Test the finished event is only fired after the pipeline has the result."""
+    agent = make_agent()
+
+    async def _create(**kwargs):
+        # Suspend like a real request so the turn task does not finish eagerly
+        await asyncio.sleep(0)
+        return text_message("Hello")
+
+    mock_client.messages.create.side_effect = _create
+    events: list[Event] = []
+
+    @callback
+    def _listener(event: Event) -> None:
+        events.append(event)
+
+    hass.bus.async_listen(EVENT_CONVERSATION_FINISHED, _listener)
+
+    result = await agent.async_process(user_input("hi", device_id="satellite"))
+
+    assert result.response.speech["plain"]["speech"] == "Hello"
+    assert events == []
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["conversation_id"] == result.conversation_id
+
+
+def _light_call(service: str) -> dict:
+    return {
+        "domain": "light",
+        "service": service,
+        "service_data": {"entity_id": "light.desk"},
+    }
+
+
+def _assert_valid_history(messages: list[dict]) -> None:
+    """Assert messages are a valid Messages API conversation."""
+    assert messages[0]["role"] == "user"
+    for index, message in enumerate(messages):
+        assert message["role"] == ("user" if index % 2 == 0 else "assistant")
+        if message["role"] != "assistant" or isinstance(message["content"], str):
+            continue
+        assert message["content"]
+        tool_use_ids = {
+            block["id"] for block in message["content"] if block["type"] == "tool_use"
+        }
+        if tool_use_ids:
+            # Every call must be answered by the next message
+            results = messages[index + 1]["content"]
+            assert {block["tool_use_id"] for block in results} == tool_use_ids
+    assert messages[-1]["role"] == "user"
+
+
+def _record_requests(
+    mock_client: MagicMock, responses: list[Message]
+) -> list[dict]:
+    """Make create return responses in order and record each request."""
+    requests: list[dict] = []
+
+    async def _create(**kwargs):
+        requests.append(copy.deepcopy(kwargs))
+        return responses.pop(0)
+
+    mock_client.messages.create.side_effect = _create
+    return requests
+
+
+async def test_multiple_tool_rounds(
+    hass: HomeAssistant,
+    make_agent: Callable[..., AnthropicAgent],
+    mock_client: MagicMock,
+) -> None:
+    """Test tool calls are answered round by round until the model replies."""
+    agent = make_agent({CONF_MAX_TOOL_CALLS_PER_CONVERSATION: 2})
+    turn_on = async_mock_service(hass, "light", "turn_on")
+    turn_off = async_mock_service(hass, "light", "turn_off")
+    requests = _record_requests(
+        mock_client,
+        [
+            tool_use_message("toolu_1", [_light_call("turn_on")]),
+            tool_use_message("toolu_2", [_light_call("turn_off")]),
+            text_message("Blinked the desk light."),
+        ],
+    )
+    events: list[Event] = []
+    hass.bus.async_listen(EVENT_CONVERSATION_FINISHED, events.append)
+
+    result = await agent.async_process(user_input("blink the desk light"))
+    await hass.async_block_till_done()
+
+    assert result.response.speech["plain"]["speech"] == "Blinked the desk light."
+    assert len(turn_on) == 1
+    assert len(turn_off) == 1
+    assert len(requests) == 3
+    for request in requests:
+        _assert_valid_history(request["messages"])
+    assert requests[2]["messages"][-1]["content"][0]["tool_use_id"] == "toolu_2"
+    assert events[0].data["usage"] == {"input_tokens": 300, "output_tokens": 50}
+
+
+async def test_tool_limit_keeps_history_valid(
+    hass: HomeAssistant,
+    make_agent: Callable[..., AnthropicAgent],
+    mock_client: MagicMock,
+) -> None:
+    """Test calls past the limit are dropped so the next turn can be sent."""
+    agent = make_agent()
+    turn_on = async_mock_service(hass, "light", "turn_on")
+    async_mock_service(hass, "light", "turn_off")
+    requests = _record_requests(
+        mock_client,
+        [
+            tool_use_message("toolu_1", [_light_call("turn_on")]),
+            tool_use_message("toolu_2", [_light_call("turn_off")]),
+            text_message("It is on."),
+        ],
+    )
+
+    result = await agent.async_process(user_input("blink the desk light"))
+
+    assert result.response.speech["plain"]["speech"] == TOOL_LIMIT_REPLY
+    assert len(turn_on) == 1
+    assert len(requests) == 2
+    stored = agent.history[result.conversation_id]
+    assert stored[-1] == {
+        "role": "assistant",
+        "content": [{"type": "text", "text": TOOL_LIMIT_REPLY}],
+    }
+
+    result = await agent.async_process(
+        user_input("is it on?", result.conversation_id)
+    )
+
+    assert result.response.speech["plain"]["speech"] == "It is on."
+    _assert_valid_history(requests[2]["messages"])
+    assert requests[2]["messages"][-1] == {"role": "user", "content": "is it on?"}
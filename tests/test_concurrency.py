@@ -0,0 +1,224 @@
+"""Tests for the Anthropic Conversation concurrency control."""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.anthropic_conversation.concurrency import (
+    PRIORITY_AUTOMATION,
+    PRIORITY_INTERACTIVE,
+    ConversationScheduler,
+    PrioritySemaphore,
+)
+from custom_components.anthropic_conversation.const import (
+    CONF_MAX_CONCURRENT_REQUESTS,
+    DATA_AGENT,
+    DOMAIN,
+)
+
+
+async def _acquire_in_order(
+    semaphore: PrioritySemaphore, priority: int, name: str, order: list[str]
+) -> None:
+    await semaphore.acquire(priority)
+    order.append(name)
+    semaphore.release()
+
+
+async def test_priority_order() -> None:
+    """Test interactive waiters go first and each priority is FIFO."""
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire(PRIORITY_AUTOMATION)
+    order: list[str] = []
+    tasks = []
+    for priority, name in (
+        (PRIORITY_AUTOMATION, "automation 1"),
+        (PRIORITY_INTERACTIVE, "interactive 1"),
+        (PRIORITY_AUTOMATION, "automation 2"),
+        (PRIORITY_INTERACTIVE, "interactive 2"),
+    ):
+        tasks.append(
+            asyncio.create_task(_acquire_in_order(semaphore, priority, name, order))
+        )
+        await asyncio.sleep(0)
+    assert semaphore.waiting() == 4
+    assert semaphore.waiting(PRIORITY_INTERACTIVE) == 2
+
+    semaphore.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive 1", "interactive 2", "automation 1", "automation 2"]
+    assert semaphore.active == 0
+    assert not semaphore.locked()
+
+
+async def test_cancel_while_waiting() -> None:
+    """Test a cancelled waiter is skipped and its slot is not lost."""
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire(PRIORITY_INTERACTIVE)
+    cancelled = asyncio.create_task(semaphore.acquire(PRIORITY_INTERACTIVE))
+    waiting = asyncio.create_task(semaphore.acquire(PRIORITY_AUTOMATION))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    assert semaphore.waiting() == 1
+
+    semaphore.release()
+    await waiting
+    assert semaphore.active == 1
+    semaphore.release()
+    assert semaphore.active == 0
+    assert not semaphore.locked()
+
+
+async def test_cancel_after_wake_hands_slot_on() -> None:
+    """Test a waiter cancelled after being woken passes the slot on."""
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire(PRIORITY_INTERACTIVE)
+    woken = asyncio.create_task(semaphore.acquire(PRIORITY_INTERACTIVE))
+    next_waiter = asyncio.create_task(semaphore.acquire(PRIORITY_AUTOMATION))
+    await asyncio.sleep(0)
+
+    # Wake the first waiter and cancel it before it gets to run
+    semaphore.release()
+    woken.cancel()
+    await asyncio.sleep(0)
+
+    assert woken.cancelled()
+    await next_waiter
+    assert semaphore.active == 1
+    semaphore.release()
+    assert not semaphore.locked()
+
+
+async def test_resize() -> None:
+    """Test growing wakes waiters and shrinking waits for holders to release."""
+    semaphore = PrioritySemaphore(1)
+    await semaphore.acquire(PRIORITY_INTERACTIVE)
+    first = asyncio.create_task(semaphore.acquire(PRIORITY_INTERACTIVE))
+    second = asyncio.create_task(semaphore.acquire(PRIORITY_AUTOMATION))
+    await asyncio.sleep(0)
+
+    semaphore.resize(2)
+    await first
+    assert semaphore.active == 2
+    assert semaphore.waiting() == 1
+
+    # Two slots are in use, the first release only pays back the excess
+    semaphore.resize(1)
+    semaphore.release()
+    await asyncio.sleep(0)
+    assert not second.done()
+    assert semaphore.locked()
+
+    semaphore.release()
+    await second
+    assert semaphore.active == 1
+    semaphore.release()
+    assert not semaphore.locked()
+    await semaphore.acquire(PRIORITY_AUTOMATION)
+    assert semaphore.locked()
+    semaphore.release()
+
+
+async def test_options_update_resizes_without_reload(
+    hass: HomeAssistant, mock_client: MagicMock
+) -> None:
+    """Test changing options keeps the agent and its state."""
+    assert await async_setup_component(hass, "homeassistant", {})
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_API_KEY: "key"})
+    entry.add_to_hass(hass)
+    with patch(
+        "custom_components.anthropic_conversation.validate_authentication",
+        return_value=mock_client,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    agent = hass.data[DOMAIN][entry.entry_id][DATA_AGENT]
+    agent.history["conversation"] = [{"role": "user", "content": "hi"}]
+
+    hass.config_entries.async_update_entry(
+        entry, options={CONF_MAX_CONCURRENT_REQUESTS: 1}
+    )
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id][DATA_AGENT] is agent
+    assert "conversation" in agent.history
+    async with agent.scheduler.slot(PRIORITY_INTERACTIVE):
+        assert agent.scheduler._semaphore.locked()
+
+
+async def test_conversation_lock_serializes_and_cleans_up() -> None:
+    """Test turns of a conversation run one at a time and locks are dropped."""
+    scheduler = ConversationScheduler(4)
+    order: list[str] = []
+    release_first = asyncio.Event()
+
+    async def turn(name: str, wait: asyncio.Event | None = None) -> None:
+        async with scheduler.conversation("conversation"):
+            order.append(f"{name} start")
+            if wait is not None:
+                await wait.wait()
+            order.append(f"{name} end")
+
+    first = asyncio.create_task(turn("first", release_first))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(turn("second"))
+    await asyncio.sleep(0)
+    assert scheduler.stats()["queued_turns"] == 1
+
+    release_first.set()
+    await asyncio.gather(first, second)
+
+    assert order == ["first start", "first end", "second start", "second end"]
+    assert scheduler._locks == {}
+    assert scheduler._lock_users == {}
+
+
+async def test_conversation_lock_cleanup_on_cancel() -> None:
+    """Test a turn cancelled while queued releases its lock reference."""
+    scheduler = ConversationScheduler(4)
+    release_first = asyncio.Event()
+
+    async def turn(wait: asyncio.Event | None = None) -> None:
+        async with scheduler.conversation("conversation"):
+            if wait is not None:
+                await wait.wait()
+
+    first = asyncio.create_task(turn(release_first))
+    await asyncio.sleep(0)
+    queued = asyncio.create_task(turn())
+    await asyncio.sleep(0)
+
+    queued.cancel()
+    await asyncio.sleep(0)
+    assert scheduler._lock_users == {"conversation": 1}
+
+    release_first.set()
+    await first
+    assert scheduler._locks == {}
+    assert scheduler._lock_users == {}
+
+
+async def test_supersede_cancels_previous_turn() -> None:
+    """Test a new turn from a device cancels the running one."""
+    scheduler = ConversationScheduler(4)
+    previous = asyncio.create_task(asyncio.sleep(10))
+    scheduler.supersede("satellite", previous)
+    current = asyncio.create_task(asyncio.sleep(0))
+    scheduler.supersede("satellite", current)
+    other = asyncio.create_task(asyncio.sleep(0))
+    scheduler.supersede("other satellite", other)
+
+    await asyncio.gather(current, other)
+    await asyncio.sleep(0)
+
+    assert previous.cancelled()
+    assert scheduler.was_superseded(previous)
+    assert not scheduler.was_superseded(current)
+    assert scheduler.stats()["superseded"] == 1
+    assert scheduler._inflight == {}
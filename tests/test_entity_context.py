@@ -0,0 +1,80 @@
+"""Tests for the Anthropic Conversation entity context."""
+from unittest.mock import patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.const import (
+    CONF_ENTITY_CONTEXT,
+    DEFAULT_PROMPT,
+    DOMAIN,
+)
+from custom_components.anthropic_conversation.entity_context import summarize_areas
+
+
+def _entity(entity_id: str, state: str, area_id: str, area: str) -> dict:
+    return {
+        "entity_id": entity_id,
+        "name": entity_id,
+        "state": state,
+        "aliases": [],
+        "area_id": area_id,
+        "area": area,
+        "floor": "Ground floor",
+    }
+
+
+EXPOSED_ENTITIES = [
+    _entity("light.stove", "on", "kitchen", "Kitchen"),
+    _entity("light.sofa", "on", "living_room", "Living room"),
+    _entity("light.reading", "off", "living_room", "Living room"),
+    _entity("cover.patio", "closed", "living_room", "Living room"),
+]
+
+
+def test_summarize_areas_keeps_entity_ids() -> None:
+    """Test collapsed areas list their entity ids per domain."""
+    expanded, summaries = summarize_areas(EXPOSED_ENTITIES, "kitchen")
+
+    assert [entity["entity_id"] for entity in expanded] == ["light.stove"]
+    assert summaries == [
+        {
+            "area_id": "living_room",
+            "name": "Living room",
+            "floor": "Ground floor",
+            "summary": "cover: 1, light: 2 (1 on)",
+            "entity_ids": {
+                "cover": ["cover.patio"],
+                "light": ["light.reading", "light.sofa"],
+            },
+        }
+    ]
+
+
+async def test_hierarchical_prompt_falls_back_to_flat(hass: HomeAssistant) -> None:
+    """Test a prompt without area_summaries gets every exposed entity."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, options={CONF_ENTITY_CONTEXT: "hierarchical"}
+    )
+    agent = AnthropicAgent(hass, entry, None)
+    old_prompt = (
+        "{% for entity in exposed_entities %}{{ entity.entity_id }} {% endfor %}"
+    )
+
+    with patch.object(agent.entity_context, "device_area", return_value="kitchen"):
+        hierarchical = agent._async_generate_prompt(
+            DEFAULT_PROMPT, EXPOSED_ENTITIES, "satellite"
+        )
+        flat = agent._async_generate_prompt(old_prompt, EXPOSED_ENTITIES, "satellite")
+
+    assert "light.stove,light.stove" in hierarchical
+    assert "Ground floor / Living room: cover: 1, light: 2 (1 on)" in hierarchical
+    assert "ids: cover.patio,light.reading,light.sofa" in hierarchical
+    assert flat.split() == [
+        "light.stove",
+        "light.sofa",
+        "light.reading",
+        "cover.patio",
+    ]
@@ -0,0 +1,150 @@
+"""Tests for the Anthropic Conversation helpers."""
+import json
+
+from anthropic.types import Usage
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.anthropic_conversation.helpers import (
+    build_conversation_event_data,
+    split_noop_entity_ids,
+    sum_usage,
+)
+
+from . import text_message, user_input
+
+TOOL_RESULT = json.dumps({"results": [{"success": True}]})
+MESSAGES = [
+    {"role": "system", "content": "You are a smart home manager"},
+    {"role": "user", "content": "hello"},
+    {"role": "assistant", "content": [{"type": "text", "text": "Hi"}]},
+    {"role": "user", "content": "turn on the desk light"},
+    {
+        "role": "assistant",
+        "content": [
+            {
+                "type": "tool_use",
+                "id": "call_1",
+                "name": "execute_services",
+                "input": {"list": []},
+            }
+        ],
+    },
+    {
+        "role": "user",
+        "content": [
+            {"type": "tool_result", "tool_use_id": "call_1", "content": TOOL_RESULT}
+        ],
+    },
+    {"role": "assistant", "content": [{"type": "text", "text": "Done"}]},
+]
+
+
+async def test_noop_skips_entities_in_target_state(hass: HomeAssistant) -> None:
+    """Test plain calls on single devices already in the target state are skipped."""
+    hass.states.async_set("light.desk", "on")
+    hass.states.async_set("light.ceiling", "off")
+    hass.states.async_set("lock.front_door", "locked")
+
+    assert split_noop_entity_ids(
+        hass, "turn_on", {"entity_id": ["light.desk", "light.ceiling"]},
+        ["light.desk", "light.ceiling"],
+    ) == (["light.ceiling"], ["light.desk"])
+    assert split_noop_entity_ids(
+        hass, "lock", {"entity_id": ["lock.front_door"]}, ["lock.front_door"]
+    ) == ([], ["lock.front_door"])
+
+
+async def test_noop_keeps_calls_with_extra_data(hass: HomeAssistant) -> None:
+    """Test a call with extra service data is never a no-op."""
+    hass.states.async_set("light.desk", "on")
+
+    assert split_noop_entity_ids(
+        hass,
+        "turn_on",
+        {"entity_id": ["light.desk"], "brightness": 10},
+        ["light.desk"],
+    ) == (["light.desk"], [])
+
+
+async def test_noop_keeps_groups(hass: HomeAssistant) -> None:
+    """Test groups are called even when their aggregate state matches."""
+    # Light, cover and old style groups are on or open as soon as one member is
+    hass.states.async_set(
+        "light.kitchen", "on", {"entity_id": ["light.counter", "light.island"]}
+    )
+    hass.states.async_set(
+        "cover.living_room", "open", {"entity_id": ["cover.left", "cover.right"]}
+    )
+    hass.states.async_set("group.downstairs", "on", {"entity_id": ["light.kitchen"]})
+
+    for service, entity_id in (
+        ("turn_on", "light.kitchen"),
+        ("open_cover", "cover.living_room"),
+        ("turn_on", "group.downstairs"),
+    ):
+        assert split_noop_entity_ids(
+            hass, service, {"entity_id": [entity_id]}, [entity_id]
+        ) == ([entity_id], [])
+
+
+async def test_noop_keeps_other_domains(hass: HomeAssistant) -> None:
+    """Test a running script is started again."""
+    hass.states.async_set("script.good_night", "on", {"mode": "parallel"})
+
+    assert split_noop_entity_ids(
+        hass, "turn_on", {"entity_id": ["script.good_night"]}, ["script.good_night"]
+    ) == (["script.good_night"], [])
+
+
+def test_sum_usage() -> None:
+    """Test the usage of every request of a turn is added up."""
+    assert sum_usage([]) is None
+    assert sum_usage(
+        [
+            Usage(input_tokens=100, output_tokens=20),
+            Usage(input_tokens=150, output_tokens=5),
+        ]
+    ) == {"input_tokens": 250, "output_tokens": 25}
+
+
+def _event_data(mode: str) -> dict:
+    return build_conversation_event_data(
+        mode,
+        "entry",
+        "conversation",
+        user_input("turn on the desk light", "conversation", "satellite"),
+        text_message("Done"),
+        {"input_tokens": 250, "output_tokens": 25},
+        MESSAGES,
+        3,
+        {"total": 0.5},
+        {"active": 0},
+    )
+
+
+def test_lean_event_data() -> None:
+    """Test the lean payload only carries the last turn."""
+    data = _event_data("lean")
+
+    assert data["turn"] == MESSAGES[3:]
+    assert "You are a smart home manager" not in json.dumps(data)
+    assert "messages" not in data
+    assert "response" not in data
+    assert data["tool_results"] == [TOOL_RESULT]
+    assert data["usage"] == {"input_tokens": 250, "output_tokens": 25}
+    assert data["device_id"] == "satellite"
+    assert data["stop_reason"] == "end_turn"
+    assert json.loads(json.dumps(data)) == data
+
+
+def test_full_event_data() -> None:
+    """Test the full payload adds the response, input and history."""
+    data = _event_data("full")
+
+    assert data["turn"] == MESSAGES[3:]
+    assert data["messages"] == MESSAGES
+    assert data["response"]["content"] == [{"type": "text", "text": "Done"}]
+    assert data["user_input"]["text"] == "turn on the desk light"
+    assert data["tool_results"] == [TOOL_RESULT]
+    assert json.loads(json.dumps(data)) == data
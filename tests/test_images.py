@@ -0,0 +1,87 @@
+"""Tests for the Anthropic Conversation image sizing."""
+import base64
+import io
+
+from PIL import Image
+
+from custom_components.anthropic_conversation.images import (
+    MAX_EDGE,
+    fit_image,
+    image_tokens,
+)
+from custom_components.anthropic_conversation.services import merge_responses
+
+
+def _image(width: int, height: int, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def _decode(fitted: dict) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(fitted["data"])))
+
+
+def test_fit_image_downscales_to_budget() -> None:
+    """Test an image over the budget is downscaled to fit it."""
+    fitted = fit_image(_image(1000, 750, "JPEG"), 400)
+
+    assert fitted["original_size"] == (1000, 750)
+    assert fitted["tokens"] <= 400
+    width, height = fitted["size"]
+    assert width < 1000
+    assert abs(width / height - 1000 / 750) < 0.01
+    assert _decode(fitted).size == fitted["size"]
+
+
+def test_fit_image_caps_long_edge() -> None:
+    """Test the long edge never exceeds what the API would keep."""
+    fitted = fit_image(_image(3200, 800, "JPEG"), 100_000)
+
+    assert fitted["size"] == (MAX_EDGE, 392)
+    assert fitted["tokens"] == image_tokens(MAX_EDGE, 392)
+
+
+def test_fit_image_keeps_small_jpeg() -> None:
+    """Test a JPEG within budget is sent unchanged."""
+    content = _image(200, 100, "JPEG")
+    fitted = fit_image(content, 1000)
+
+    assert fitted["size"] == (200, 100)
+    assert base64.b64decode(fitted["data"]) == content
+
+
+def test_fit_image_converts_to_jpeg() -> None:
+    """Test other formats are re-encoded as JPEG even if not scaled."""
+    image = Image.new("RGBA", (200, 100), (255, 0, 0, 128))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    fitted = fit_image(buffer.getvalue(), 1000)
+
+    assert fitted["media_type"] == "image/jpeg"
+    assert fitted["size"] == (200, 100)
+    assert _decode(fitted).format == "JPEG"
+
+
+def test_merge_responses() -> None:
+    """Test parallel responses are merged in order with summed usage."""
+    first = {
+        "id": "msg_1",
+        "content": [{"type": "text", "text": "A cat."}],
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": 100, "output_tokens": 10},
+    }
+    second = {
+        "id": "msg_2",
+        "content": [{"type": "text", "text": "A dog."}],
+        "stop_reason": "max_tokens",
+        "usage": {"input_tokens": 200, "output_tokens": None},
+    }
+
+    assert merge_responses([first]) is first
+    merged = merge_responses([first, second])
+    assert merged["id"] == "msg_1"
+    assert [block["text"] for block in merged["content"]] == ["A cat.", "A dog."]
+    assert merged["stop_reason"] == "max_tokens"
+    assert merged["usage"] == {"input_tokens": 300, "output_tokens": 10}
+    assert merged["responses"] == [first, second]
@@ -0,0 +1,108 @@
+"""Tests for preparing Anthropic Conversation turns ahead of time."""
+import asyncio
+from collections.abc import Callable
+from unittest.mock import MagicMock, patch
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.concurrency import PRIORITY_INTERACTIVE
+from custom_components.anthropic_conversation.const import (
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_PROMPT_CACHE,
+    PREPARE_TTL,
+)
+
+from . import text_message, user_input
+
+
+async def test_prepare_without_device_only_warms_connection(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test preparing without a device stores nothing any turn could take."""
+    agent = make_agent({CONF_PROMPT_CACHE: True})
+
+    await agent.async_prepare()
+
+    mock_client.get.assert_awaited_once()
+    mock_client.messages.create.assert_not_called()
+    assert agent._prepared == {}
+
+
+async def test_prepared_turn_is_consumed_by_its_device(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test only the next turn of the prepared device uses the prepared state."""
+    agent = make_agent()
+    mock_client.messages.create.return_value = text_message("Hi")
+
+    with patch.object(
+        agent, "_generate_system_message", wraps=agent._generate_system_message
+    ) as generate:
+        await agent.async_prepare("satellite")
+        assert generate.call_count == 1
+        assert "satellite" in agent._prepared
+        mock_client.get.assert_awaited_once()
+
+        await agent.async_process(user_input("hi", device_id="other satellite"))
+        assert generate.call_count == 2
+        assert "satellite" in agent._prepared
+
+        await agent.async_process(user_input("hi", device_id="satellite"))
+        assert generate.call_count == 2
+        assert agent._prepared == {}
+
+        await agent.async_process(user_input("hi", device_id="satellite"))
+        assert generate.call_count == 3
+
+
+async def test_prepared_turn_expires(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test prepared state older than the TTL is dropped, not used."""
+    agent = make_agent()
+    await agent.async_prepare("satellite")
+    agent._prepared["satellite"].created -= PREPARE_TTL + 1
+
+    assert agent._take_prepared("satellite") is None
+    assert agent._prepared == {}
+    assert agent._take_prepared(None) is None
+
+
+async def test_prepare_writes_cache_for_new_conversation(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test the prompt is only written to the cache for a new conversation."""
+    agent = make_agent({CONF_PROMPT_CACHE: True})
+    mock_client.messages.create.return_value = text_message("", 1000, 1)
+
+    await agent.async_prepare("satellite")
+
+    mock_client.get.assert_not_called()
+    kwargs = mock_client.messages.create.call_args.kwargs
+    assert kwargs["max_tokens"] == 1
+    assert kwargs["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert agent.usage.input_tokens_today == 1000
+
+    result = await agent.async_process(user_input("hi", device_id="satellite"))
+    mock_client.messages.create.reset_mock()
+    await agent.async_prepare("satellite", result.conversation_id)
+
+    mock_client.messages.create.assert_not_called()
+    mock_client.get.assert_awaited_once()
+    assert agent._prepared["satellite"].system_message is None
+
+
+async def test_cache_write_waits_for_a_slot(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test the cache write request counts against the concurrency cap."""
+    agent = make_agent({CONF_PROMPT_CACHE: True, CONF_MAX_CONCURRENT_REQUESTS: 1})
+    mock_client.messages.create.return_value = text_message("", 1000, 1)
+
+    async with agent.scheduler.slot(PRIORITY_INTERACTIVE):
+        task = asyncio.create_task(agent.async_prepare("satellite"))
+        await asyncio.sleep(0)
+        mock_client.messages.create.assert_not_called()
+        assert agent.scheduler.stats()["waiting"]["automation"] == 1
+
+    await task
+    mock_client.messages.create.assert_awaited_once()
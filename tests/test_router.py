@@ -0,0 +1,42 @@
+"""Tests for the Anthropic Conversation model router."""
+from custom_components.anthropic_conversation.const import (
+    CONF_FAST_MODEL,
+    CONF_MODEL,
+    CONF_MODEL_ROUTING,
+)
+from custom_components.anthropic_conversation.router import (
+    MAX_FAILED_CONVERSATIONS,
+    ModelRouter,
+)
+
+OPTIONS = {CONF_MODEL_ROUTING: True, CONF_MODEL: "large", CONF_FAST_MODEL: "fast"}
+
+
+def test_failure_escalates_until_success() -> None:
+    """Test a failed conversation goes to the large model until a turn succeeds."""
+    router = ModelRouter()
+    assert router.select(OPTIONS, "conversation", "turn on the light", 1) == "fast"
+
+    router.record_failure("conversation")
+    assert router.select(OPTIONS, "conversation", "turn on the light", 1) == "large"
+    assert router.select(OPTIONS, "other", "turn on the light", 1) == "fast"
+
+    router.record_success("conversation")
+    assert router.select(OPTIONS, "conversation", "turn on the light", 1) == "fast"
+
+
+def test_failed_conversations_are_bounded() -> None:
+    """Test abandoned failed conversations are forgotten oldest first."""
+    router = ModelRouter()
+    router.record_failure("abandoned")
+    router.record_failure("refreshed")
+    for index in range(MAX_FAILED_CONVERSATIONS - 2):
+        router.record_failure(f"conversation {index}")
+    # A repeated failure counts as the most recent
+    router.record_failure("refreshed")
+    router.record_failure("newest")
+
+    assert len(router._failed) == MAX_FAILED_CONVERSATIONS
+    assert router.select(OPTIONS, "abandoned", "turn on the light", 1) == "fast"
+    assert router.select(OPTIONS, "refreshed", "turn on the light", 1) == "large"
+    assert router.select(OPTIONS, "newest", "turn on the light", 1) == "large"
@@ -0,0 +1,63 @@
+"""Tests for the Anthropic Conversation services."""
+import pytest
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.anthropic_conversation.const import (
+    DOMAIN,
+    MIN_IMAGE_TOKENS,
+    SERVICE_QUERY_IMAGE,
+)
+from custom_components.anthropic_conversation.services import async_setup_services
+
+
+async def test_query_image_rejects_unusable_budget(hass: HomeAssistant) -> None:
+    """Test a budget too small for each image raises instead of sending 1x1 images."""
+    await async_setup_services(hass, {})
+    images = [{"url": "http://example.com/1.jpg"}, {"url": "http://example.com/2.jpg"}]
+
+    with pytest.raises(vol.Invalid):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_QUERY_IMAGE,
+            {
+                "config_entry": "entry",
+                "prompt": "What is this?",
+                "images": images,
+                "max_image_tokens": 0,
+            },
+            blocking=True,
+            return_response=True,
+        )
+
+    with pytest.raises(HomeAssistantError, match="tokens per image"):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_QUERY_IMAGE,
+            {
+                "config_entry": "entry",
+                "prompt": "What is this?",
+                "images": images,
+                "max_image_tokens": MIN_IMAGE_TOKENS,
+            },
+            blocking=True,
+            return_response=True,
+        )
+
+    # The budget is shared by all images, also when they go in separate requests
+    with pytest.raises(HomeAssistantError, match="tokens per image"):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_QUERY_IMAGE,
+            {
+                "config_entry": "entry",
+                "prompt": "What is this?",
+                "images": images,
+                "max_image_tokens": MIN_IMAGE_TOKENS * 3 // 2,
+                "max_images_per_request": 1,
+            },
+            blocking=True,
+            return_response=True,
+        )
@@ -0,0 +1,147 @@
+"""Tests for the Anthropic Conversation token estimation and pricing."""
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.anthropic_conversation.tokens import (
+    CHARS_PER_TOKEN,
+    MESSAGE_OVERHEAD,
+    TOOLS_OVERHEAD,
+    TokenEstimator,
+    billed_input_tokens,
+    truncate_messages,
+    usage_cost,
+)
+
+SYSTEM = {"role": "system", "content": "s" * 350}
+
+
+def _turn(index: int, with_tool: bool = False) -> list[dict]:
+    messages = [{"role": "user", "content": f"question {index} " + "q" * 340}]
+    if with_tool:
+        messages += [
+            {
+                "role": "assistant",
+                "content": [
+                    {
+                        "type": "tool_use",
+                        "id": f"call_{index}",
+                        "name": "execute_services",
+                        "input": {"list": []},
+                    }
+                ],
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": f"call_{index}",
+                        "content": "r" * 350,
+                    }
+                ],
+            },
+        ]
+    messages.append(
+        {"role": "assistant", "content": [{"type": "text", "text": "a" * 350}]}
+    )
+    return messages
+
+
+def _assert_tool_pairs(messages: list[dict]) -> None:
+    """Assert every tool result follows the tool use it answers."""
+    for index, message in enumerate(messages):
+        if message["role"] != "user" or isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if block["type"] != "tool_result":
+                continue
+            previous = messages[index - 1]
+            assert previous["role"] == "assistant"
+            assert block["tool_use_id"] in {
+                tool_use["id"]
+                for tool_use in previous["content"]
+                if tool_use["type"] == "tool_use"
+            }
+
+
+def test_estimate() -> None:
+    """Test the estimate counts characters, framing and tools."""
+    estimator = TokenEstimator()
+    message = {"role": "user", "content": "x" * 350}
+    tools = [{"name": "tool"}]
+
+    assert estimator.message_tokens(message) == 100 + MESSAGE_OVERHEAD
+    assert estimator.tools_tokens([]) == 0
+    assert estimator.estimate([message], tools) == (
+        100
+        + MESSAGE_OVERHEAD
+        + int(len('[{"name": "tool"}]') / CHARS_PER_TOKEN + TOOLS_OVERHEAD)
+    )
+
+
+def test_calibrate() -> None:
+    """Test the correction follows the billed tokens and ignores empty counts."""
+    estimator = TokenEstimator()
+    estimator.calibrate(0, 100)
+    estimator.calibrate(100, 0)
+    assert estimator.correction == 1.0
+
+    for _ in range(100):
+        estimated = estimator.estimate([{"role": "user", "content": "x" * 3500}], [])
+        estimator.calibrate(estimated, 2 * 1004)
+    assert estimator.correction == pytest.approx(2.0, rel=0.01)
+
+
+def test_truncate_clear() -> None:
+    """Test clear keeps only the system message and the current turn."""
+    estimator = TokenEstimator()
+    current = {"role": "user", "content": "current"}
+    messages = [SYSTEM, *_turn(1, True), *_turn(2), current]
+
+    assert truncate_messages(messages, "clear", 10, estimator, []) == [
+        SYSTEM,
+        current,
+    ]
+
+
+def test_truncate_trim_keeps_tool_pairs() -> None:
+    """Test trim drops whole turns, oldest first, until the estimate fits."""
+    estimator = TokenEstimator()
+    current = {"role": "user", "content": "current"}
+    messages = [SYSTEM, *_turn(1, True), *_turn(2, True), *_turn(3, True), current]
+    per_turn = sum(estimator.message_tokens(message) for message in _turn(1, True))
+    threshold = estimator.estimate(messages, []) - per_turn - 1
+
+    truncated = truncate_messages(messages, "trim", threshold, estimator, [])
+
+    assert truncated == [SYSTEM, *_turn(3, True), current]
+    assert estimator.estimate(truncated, []) <= threshold
+    _assert_tool_pairs(truncated)
+
+
+def test_truncate_keeps_current_turn() -> None:
+    """Test a single turn is never truncated."""
+    estimator = TokenEstimator()
+    messages = [SYSTEM, {"role": "user", "content": "current"}]
+
+    assert truncate_messages(messages, "trim", 1, estimator, []) == messages
+
+
+def test_usage_cost() -> None:
+    """Test cost by model prefix including cache writes and reads."""
+    usage = SimpleNamespace(
+        input_tokens=1_000_000,
+        output_tokens=100_000,
+        cache_creation_input_tokens=1_000_000,
+        cache_read_input_tokens=1_000_000,
+    )
+
+    # 3.00 input, 3.75 cache write, 0.30 cache read, 1.50 output
+    assert usage_cost("claude-3-5-sonnet-20240620", usage) == pytest.approx(8.55)
+    assert usage_cost("unknown-model", usage) == pytest.approx(8.55)
+    assert usage_cost(
+        "claude-3-haiku-20240307",
+        SimpleNamespace(input_tokens=1_000_000, output_tokens=1_000_000),
+    ) == pytest.approx(1.5)
+    assert billed_input_tokens(usage) == 3_000_000
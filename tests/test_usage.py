@@ -0,0 +1,122 @@
+"""Tests for the Anthropic Conversation usage tracker."""
+from collections.abc import Callable
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from freezegun.api import FrozenDateTimeFactory
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.setup import async_setup_component
+import homeassistant.util.dt as dt_util
+
+from custom_components.anthropic_conversation import AnthropicAgent
+from custom_components.anthropic_conversation.const import (
+    CONF_CONTEXT_THRESHOLD,
+    CONF_CONTEXT_TRUNCATE_STRATEGY,
+    CONF_DAILY_COST_CAP,
+    CONF_TOOLS,
+    DATA_AGENT,
+    DEFAULT_FAST_MODEL,
+    DEFAULT_MODEL,
+    DOMAIN,
+    SIGNAL_USAGE_UPDATED,
+)
+from custom_components.anthropic_conversation.usage import UsageTracker
+
+from . import text_message, user_input
+
+
+async def test_daily_counters_reset_at_midnight(
+    hass: HomeAssistant, freezer: FrozenDateTimeFactory
+) -> None:
+    """Test the daily counters reset at midnight without a request."""
+    freezer.move_to(dt_util.start_of_local_day() + timedelta(hours=23, minutes=59))
+    usage = UsageTracker(hass, "entry")
+    unsub = usage.async_setup()
+    updates = []
+    async_dispatcher_connect(
+        hass, SIGNAL_USAGE_UPDATED.format("entry"), lambda: updates.append(True)
+    )
+
+    usage.async_record(
+        "claude-3-haiku-20240307",
+        SimpleNamespace(input_tokens=1000, output_tokens=100),
+    )
+    day_start = usage.day_start
+    assert usage.input_tokens_today == 1000
+    assert len(updates) == 1
+
+    freezer.tick(timedelta(minutes=1))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    assert usage.day_start == day_start + timedelta(days=1)
+    assert usage.input_tokens_today == 0
+    assert usage.output_tokens_today == 0
+    assert usage.cost_today == 0
+    assert usage.cost_total > 0
+    assert len(updates) == 2
+    unsub()
+
+
+async def test_counters_survive_reload(
+    hass: HomeAssistant, mock_client: MagicMock
+) -> None:
+    """Test usage recorded just before a reload is not lost."""
+    assert await async_setup_component(hass, "homeassistant", {})
+    entry = MockConfigEntry(domain=DOMAIN, data={CONF_API_KEY: "key"})
+    entry.add_to_hass(hass)
+    with patch(
+        "custom_components.anthropic_conversation.validate_authentication",
+        return_value=mock_client,
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        usage = hass.data[DOMAIN][entry.entry_id][DATA_AGENT].usage
+        usage.async_record(
+            "claude-3-haiku-20240307",
+            SimpleNamespace(input_tokens=1000, output_tokens=100),
+        )
+        assert await hass.config_entries.async_reload(entry.entry_id)
+
+    reloaded = hass.data[DOMAIN][entry.entry_id][DATA_AGENT].usage
+    assert reloaded is not usage
+    assert reloaded.input_tokens_today == 1000
+    assert reloaded.cost_today == usage.cost_today
+
+
+async def test_over_cap_turn_is_degraded(
+    make_agent: Callable[..., AnthropicAgent], mock_client: MagicMock
+) -> None:
+    """Test a turn over the daily cap uses the fast model and less context."""
+    agent = make_agent(
+        {
+            CONF_DAILY_COST_CAP: 0.01,
+            CONF_CONTEXT_THRESHOLD: 1000,
+            CONF_CONTEXT_TRUNCATE_STRATEGY: "clear",
+            CONF_TOOLS: [],
+        }
+    )
+    mock_client.messages.create.return_value = text_message("Hi")
+    # Two turns of about 150 tokens each, over a quarter of the threshold
+    result = await agent.async_process(user_input("a" * 500))
+    await agent.async_process(user_input("b" * 500, result.conversation_id))
+    assert mock_client.messages.create.call_args.kwargs["model"] == DEFAULT_MODEL
+    assert len(mock_client.messages.create.call_args.kwargs["messages"]) == 3
+
+    agent.usage.async_record(
+        DEFAULT_MODEL, SimpleNamespace(input_tokens=10_000, output_tokens=0)
+    )
+    assert agent.usage.async_over_cap(0.01)
+    await agent.async_process(user_input("c" * 500, result.conversation_id))
+
+    kwargs = mock_client.messages.create.call_args.kwargs
+    assert kwargs["model"] == DEFAULT_FAST_MODEL
+    assert kwargs["messages"] == [{"role": "user", "content": "c" * 500}]
+    assert agent.router.reasons["degraded"] == 1